@@ -1,12 +1,141 @@
 import os
 
+from cache import LRUCache
+from flask import current_app
 from flask_admin import Admin
 from flask_admin.contrib.sqla import ModelView
 from markupsafe import Markup
-from models import Favorite, People, Planet, User, Vehicle, db
+from models import FAVORITE_TYPES, Favorite, People, Planet, User, Vehicle, db
+from routes import FAVORITE_MODELS
+from search import search_filter
+from sqlalchemy import inspect
+from wtforms import SelectField
+from wtforms.validators import ValidationError
 
- 
-class ImageModelView(ModelView):
+# Table name -> row count shown under unfiltered admin lists
+count_cache = LRUCache(max_entries=64)
+
+
+class CachedCount:
+    """Stands in for the count query Flask-Admin calls .scalar() on"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def scalar(self):
+        table = self.model.__table__
+        count = count_cache.get(table.name)
+        if count is None:
+            count = table_count(table)
+            count_cache.set(table.name, count)
+        return count
+
+
+def table_count(table):
+    """Exact COUNT(*), or a cheap estimate with ADMIN_APPROXIMATE_COUNTS"""
+    if current_app.config.get("ADMIN_APPROXIMATE_COUNTS"):
+        if db.session.get_bind().dialect.name == "postgresql":
+            # Planner statistics, kept current by autovacuum/ANALYZE
+            estimate = db.session.scalar(
+                db.text(
+                    "SELECT CAST(reltuples AS bigint) FROM pg_class "
+                    "WHERE oid = CAST(:table AS regclass)"
+                ),
+                {"table": table.name},
+            )
+            if estimate is not None and estimate >= 0:
+                return estimate
+        else:
+            # Highest id: an index lookup, exact until rows are deleted
+            return db.session.scalar(db.select(db.func.max(table.c.id))) or 0
+    return db.session.scalar(db.select(db.func.count()).select_from(table))
+
+
+class FastModelView(ModelView):
+    """List views that stay quick on large tables.
+
+    Pages are ordered by the primary key, related rows shown in the list are
+    joined into the page query, searches go through indexed lookups (see
+    search_clause) and the unfiltered row count is cached for
+    ADMIN_COUNT_TTL seconds instead of running COUNT(*) on every page.
+    """
+
+    page_size = 50
+    can_set_page_size = True
+    page_size_options = (20, 50, 100)
+    column_display_pk = True
+    column_default_sort = ("id", True)
+    column_sortable_list = ("id",)
+
+    def scaffold_auto_joins(self):
+        """Also join many-to-one relations shown as "relation.column".
+
+        Flask-Admin only joins relations listed by name, so a dotted column
+        like "user.email" would otherwise lazy-load once per row.
+        """
+        joins = super().scaffold_auto_joins()
+        relationships = inspect(self.model).relationships
+        for name, _ in self._list_columns:
+            relation = name.split(".")[0]
+            if (
+                "." in name
+                and relation in relationships
+                and relationships[relation].direction.name == "MANYTOONE"
+            ):
+                attribute = getattr(self.model, relation)
+                if not any(join is attribute for join in joins):
+                    joins.append(attribute)
+        return joins
+
+    def search_clause(self, search):
+        """WHERE clause for the search box; None matches nothing"""
+        return None
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        clause = self.search_clause(search)
+        if clause is None:
+            clause = db.false()
+        query = query.filter(clause)
+        if count_query is not None:
+            count_query = count_query.filter(clause)
+        return query, count_query, joins, count_joins
+
+    def get_count_query(self):
+        view_args = self._get_list_extra_args()
+        if view_args.search or view_args.filters:
+            return super().get_count_query()
+        count_cache.ttl = current_app.config.get("ADMIN_COUNT_TTL", 60)
+        return CachedCount(self.model)
+
+    def after_model_change(self, form, model, is_created):
+        count_cache.pop(self.model.__tablename__)
+
+    def after_model_delete(self, model):
+        count_cache.pop(self.model.__tablename__)
+
+
+class UserView(FastModelView):
+    column_searchable_list = ["email"]
+    column_filters = ["is_active"]
+    column_sortable_list = ("id", "email")
+
+    def search_clause(self, search):
+        # Prefix match as a range, so the unique index on email is used
+        term = search.strip()
+        return User.email.between(term, term + "\uffff") if term else None
+
+
+class CatalogView(FastModelView):
+    """Catalog lists searched through the full-text index (search.py)"""
+
+    search_type = None
+    column_searchable_list = ["name"]
+
+    def search_clause(self, search):
+        return search_filter(self.search_type, search)
+
+
+class ImageModelView(CatalogView):
     """Custom ModelView for models with image URLs"""
 
     def _list_thumbnail(view, context, model, name):
@@ -20,42 +149,77 @@ class ImageModelView(ModelView):
 
 
 class PeopleView(ImageModelView):
+    search_type = "people"
     column_list = ["name", "gender", "birth_year", "image_url"]
     column_labels = {"image_url": "Image Preview"}
     form_columns = ["name", "gender", "birth_year", "image_url"]
 
 
 class PlanetView(ImageModelView):
+    search_type = "planet"
     column_list = ["name", "climate", "population", "image_url"]
     column_labels = {"image_url": "Image Preview"}
     form_columns = ["name", "climate", "population", "image_url"]
 
 
 class VehicleView(ImageModelView):
+    search_type = "vehicle"
     column_list = ["name", "model", "manufacturer", "image_url"]
     column_labels = {"image_url": "Image Preview"}
     form_columns = ["name", "model", "manufacturer", "image_url"]
 
 
-class FavoriteView(ModelView):
+class FavoriteView(FastModelView):
     column_list = ["user.email", "people.name", "planet.name", "vehicle.name"]
+    column_searchable_list = ["user.email"]
     column_labels = {
         "user.email": "User Email",
         "people.name": "Favorite Character",
         "planet.name": "Favorite Planet",
         "vehicle.name": "Favorite Vehicle",
     }
+    # The people/planet/vehicle relationships are view-only; edit the columns
+    form_columns = ["user", "entity_type", "entity_id"]
+    form_overrides = {"entity_type": SelectField}
+    form_args = {
+        "entity_type": {
+            "label": "Type",
+            "choices": [(code, name) for name, code in FAVORITE_TYPES.items()],
+            "coerce": int,
+        },
+        "entity_id": {"label": "Entity Id"},
+    }
+    form_ajax_refs = {"user": {"fields": ["email"]}}
+
+    def on_model_change(self, form, model, is_created):
+        # entity_id has no foreign key, so check the entity exists here
+        names = {code: name for name, code in FAVORITE_TYPES.items()}
+        entity_model = FAVORITE_MODELS[names[model.entity_type]]
+        if db.session.get(entity_model, model.entity_id) is None:
+            raise ValidationError(
+                f"No {names[model.entity_type]} with id {model.entity_id}"
+            )
+
+    def search_clause(self, search):
+        # Favorites of users whose email starts with the term (unique index)
+        term = search.strip()
+        if not term:
+            return None
+        users = db.select(User.id).where(User.email.between(term, term + "\uffff"))
+        return Favorite.user_id.in_(users)
 
 
 def setup_admin(app):
     app.secret_key = os.environ.get("FLASK_APP_KEY", "sample key")
     app.config["FLASK_ADMIN_SWATCH"] = "cerulean"
+    app.config.setdefault("ADMIN_COUNT_TTL", 60)
+    app.config.setdefault("ADMIN_APPROXIMATE_COUNTS", False)
     admin = Admin(
         app, name="Star Wars Admin", template_mode="bootstrap3", index_view=None
     )
 
     # Add model views with image support
-    admin.add_view(ModelView(User, db.session))
+    admin.add_view(UserView(User, db.session))
     admin.add_view(PeopleView(People, db.session))
     admin.add_view(PlanetView(Planet, db.session))
     admin.add_view(VehicleView(Vehicle, db.session))
@@ -1,70 +1,109 @@
 """
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
+
+create_app() is the only entry point: the flask CLI finds it on its own and
+servers build their app in wsgi.py / asgi.py, so importing this module has
+no side effects. ADMIN_ENABLED and SWAGGER_ENABLED (FLASK_ADMIN_ENABLED=false,
+FLASK_SWAGGER_ENABLED=false) leave the admin panel and Swagger UI out of
+API-only workers, which then never import Flask-Admin.
 """
 
-import os 
+import os
 
-from admin import setup_admin
+import click
+from auth import setup_user_loader
+from cache import response_cache
+from catalog_cli import catalog_cli
+from compression import init_app as setup_compression
+from database import configure_database, setup_fork_safety, setup_sqlite_pragmas
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
+from json_provider import FastJSONProvider
+from metrics import init_app as setup_metrics
 from models import db
+from passwords import passwords
+from replicas import init_app as setup_replicas
 from routes import api as api_bp
+from snapshot import catalog_snapshot
 from utils import APIException, generate_sitemap
 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.url_map.strict_slashes = False
-
-    # Swagger UI setup
-    from flask_swagger_ui import get_swaggerui_blueprint
-
-    SWAGGER_URL = "/swagger"
-
-    @app.route("/")
-    def index():
-        """Root route with a simple welcome message."""
-        return """
-            <h2>Welcome to the Star Wars API!</h2>
-            <ul>
-                <li><a href='/swagger'>API Documentation (Swagger UI)</a></li>
-                <li><a href='/admin'>Admin Panel</a></li>
-            </ul>
-            """
-
-    API_URL = "/static/swagger.json"
-    swaggerui_blueprint = get_swaggerui_blueprint(
-        SWAGGER_URL, API_URL, config={"app_name": "Star Wars API"}
-    )
-    app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+    # orjson-backed encoder with the same output as Flask's default provider
+    app.json = FastJSONProvider(app)
 
     # Session configuration
     app.config["SECRET_KEY"] = os.getenv(
         "SECRET_KEY", "dev-secret-key-change-in-production"
     )
 
-    # Simple SQLite database configuration
-    app.config["SQLALCHEMY_DATABASE_URI"] = (
-        "sqlite:////Users/salemmohd/Documents/GitHub/salem-flask-rest-star/instance/database.db"
-    )
+    app.config["JWT_SECRET_KEY"] = os.getenv(
+        "JWT_SECRET_KEY", "super-secret-key"
+    )  # Change in production!
+
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # FLASK_* environment variables override any config key,
+    # e.g. FLASK_RESPONSE_CACHE_SIZE=1024
+    app.config.from_prefixed_env()
+
+    # Overrides for scripts and benchmarks (e.g. a temporary database)
+    if config:
+        app.config.update(config)
+    app.config.setdefault("ADMIN_ENABLED", True)
+    app.config.setdefault("SWAGGER_ENABLED", True)
+
+    # Database URI, pool and SQLite pragmas (see database.py for env vars)
+    configure_database(app)
     db.init_app(app)
-    Migrate(app, db)
+    setup_sqlite_pragmas(app)
+    setup_fork_safety(app)
+    setup_replicas(app)
+    # Request latency, SQL counts and /metrics (see metrics.py for config)
+    setup_metrics(app)
+    # Only the flask CLI (flask db ...) needs Flask-Migrate, which imports
+    # Alembic; servers skip it
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+    response_cache.init_app(app)
+    catalog_snapshot.init_app(app)
+    setup_compression(app)
+    passwords.init_app(app)
 
     # JWT setup
-    app.config["JWT_SECRET_KEY"] = os.getenv(
-        "JWT_SECRET_KEY", "super-secret-key"
-    )  # Change in production!
     jwt = JWTManager(app)
+    setup_user_loader(app, jwt)
 
     # CORS for frontend
     CORS(app, supports_credentials=True, origins=os.getenv("FRONTEND_URL", "*"))
 
-    setup_admin(app)
+    links = []
+    if app.config["SWAGGER_ENABLED"]:
+        setup_swagger(app)
+        links.append("<li><a href='/swagger'>API Documentation (Swagger UI)</a></li>")
+    if app.config["ADMIN_ENABLED"]:
+        from admin import setup_admin
+
+        setup_admin(app)
+        links.append("<li><a href='/admin'>Admin Panel</a></li>")
+
+    @app.route("/")
+    def index():
+        """Root route with a simple welcome message."""
+        return f"""
+            <h2>Welcome to the Star Wars API!</h2>
+            <ul>
+                {"".join(links)}
+            </ul>
+            """
+
     app.register_blueprint(api_bp)
+    app.cli.add_command(catalog_cli)
 
     @app.errorhandler(APIException)
     def handle_api_exception(error):
@@ -73,9 +112,17 @@ def create_app():
     return app
 
 
-# Expose app for Flask CLI
-app = create_app()
+def setup_swagger(app):
+    from flask_swagger_ui import get_swaggerui_blueprint
+
+    SWAGGER_URL = "/swagger"
+    API_URL = "/static/swagger.json"
+    swaggerui_blueprint = get_swaggerui_blueprint(
+        SWAGGER_URL, API_URL, config={"app_name": "Star Wars API"}
+    )
+    app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+
 
 if __name__ == "__main__":
     PORT = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=PORT, debug=True)
+    create_app().run(host="0.0.0.0", port=PORT, debug=True)
@@ -0,0 +1,281 @@
+"""
+Optional ASGI entry point serving the read API with async SQLAlchemy.
+
+    uvicorn asgi:application --workers 4
+
+GET /api/people, /api/planets and /api/vehicles (full lists, ?limit/?after
+pages, ?ids= batches, ?fields= and ?stream=), the matching detail routes and
+GET /api/users/favorites run on an AsyncEngine: aiosqlite for SQLite,
+asyncpg for Postgres, built from the same DATABASE_URL and pool settings as
+the Flask app. Each request still goes through the Flask app's request
+context, before_request hooks (metrics), argument parsing, response cache,
+error handlers and after_request hooks (compression, CORS), so it gets the
+same bytes and status codes as the WSGI routes. Every other request runs
+through the Flask app in a worker thread.
+"""
+
+import asyncio
+import os
+
+from app import create_app
+from cache import build_response, cache_key, response_cache, store_response
+from database import pragma_listener
+from flask import current_app, jsonify, request
+from flask_jwt_extended import current_user, verify_jwt_in_request
+from metrics import instrument_engine
+from models import Favorite
+from routes import (
+    CATALOG_MODELS,
+    catalog_select,
+    ids_query,
+    page_body,
+    page_query,
+    parse_fields,
+    parse_ids,
+    stream_chunk,
+    stream_end,
+    stream_mimetype,
+    stream_query,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from utils import stream_format
+from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.routing import Map, Rule
+from werkzeug.test import EnvironBuilder
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+COLLECTIONS = "any(" + ",".join(CATALOG_MODELS) + ")"
+
+
+def async_url(uri):
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_engine_for(app):
+    """AsyncEngine with the app's database URI, pool options and pragmas"""
+    url = async_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    engine = create_async_engine(url, **app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    if pragmas and url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", pragma_listener(pragmas))
+    if app.config["METRICS_ENABLED"]:
+        instrument_engine(engine.sync_engine)
+    return engine
+
+
+class AsyncStream:
+    """A streamed body produced by an async generator"""
+
+    def __init__(self, mimetype, chunks):
+        self.mimetype = mimetype
+        self.chunks = chunks
+
+
+class AsyncReadAPI:
+    def __init__(self, app):
+        self.app = app
+        self.engine = create_engine_for(app)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.url_map = Map(
+            [
+                Rule(f"/api/<{COLLECTIONS}:collection>", endpoint=self.entities),
+                Rule(
+                    f"/api/<{COLLECTIONS}:collection>/<int:entity_id>",
+                    endpoint=self.entity,
+                ),
+                Rule("/api/users/favorites", endpoint=self.favorites),
+            ],
+            strict_slashes=False,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        view = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            adapter = self.url_map.bind("", path_info=scope["path"])
+            try:
+                view, view_args = adapter.match()
+            except HTTPException:
+                pass
+        if view is not None:
+            return await self.dispatch(scope, send, view, view_args)
+        if scope["type"] == "http":
+            return await self.passthrough(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def passthrough(self, scope, receive, send):
+        """Run any other request through the Flask app in a worker thread"""
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        environ = self.environ(scope, b"".join(body))
+        response = await asyncio.to_thread(
+            self.app.response_class.from_app, self.app, environ, buffered=True
+        )
+        await self.send_response(scope, send, response)
+
+    def environ(self, scope, body=b""):
+        headers = [
+            (k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]
+        ]
+        client = scope.get("client") or ("", 0)
+        host = dict(headers).get("host", "localhost")
+        scheme = scope.get("scheme", "http")
+        root_path = scope.get("root_path", "")
+        return EnvironBuilder(
+            path=scope["path"],
+            base_url=f"{scheme}://{host}{root_path}",
+            query_string=scope["query_string"].decode("latin-1"),
+            method=scope["method"],
+            headers=headers,
+            data=body,
+            environ_base={"REMOTE_ADDR": client[0]},
+        ).get_environ()
+
+    async def dispatch(self, scope, send, view, view_args):
+        app = self.app
+        async with self.sessions() as session:
+            with app.request_context(self.environ(scope)):
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(session, **view_args)
+                except Exception as error:
+                    try:
+                        rv = app.handle_user_exception(error)
+                    except Exception as unhandled:
+                        rv = app.handle_exception(unhandled)
+                stream = rv if isinstance(rv, AsyncStream) else None
+                if stream is not None:
+                    # Headers go through the hooks now, the body follows below
+                    rv = app.response_class(iter(()), mimetype=stream.mimetype)
+                response = app.process_response(app.make_response(rv))
+            await self.send_response(scope, send, response, stream)
+
+    async def send_response(self, scope, send, response, stream=None):
+        headers = [
+            (key.lower().encode("latin-1"), value.encode("latin-1"))
+            for key, value in response.headers.items()
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+        elif stream is not None:
+            async for chunk in stream.chunks:
+                body = chunk.encode()
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": True}
+                )
+            await send({"type": "http.response.body", "body": b""})
+        else:
+            await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def cached(self, render):
+        """Async counterpart of cache.cached_response for a render coroutine"""
+        enabled = current_app.config.get("RESPONSE_CACHE_ENABLED", True)
+        if not enabled or stream_format(request):
+            return await render()
+        key = cache_key()
+        entry = response_cache.get(key)
+        if entry is not None:
+            return build_response(entry)
+        generation = response_cache.generation
+        response = current_app.make_response(await render())
+        if response.status_code != 200:
+            return response
+        return store_response(key, response, generation)
+
+    async def entities(self, session, collection):
+        model_class = CATALOG_MODELS[collection]
+        fields = parse_fields(model_class)
+        ids = parse_ids()
+        fmt = stream_format(request)
+        if fmt and ids is None:
+            return self.stream(session, model_class, fmt, fields)
+
+        async def render():
+            if ids is not None:
+                result = await session.execute(ids_query(model_class, fields, ids))
+                return jsonify([dict(row) for row in result.mappings()])
+            if "limit" in request.args or "after" in request.args:
+                query, limit, keyed = page_query(model_class, fields)
+                result = await session.execute(query)
+                return jsonify(page_body(result.mappings(), limit, fields, keyed))
+            query = catalog_select(model_class, fields).order_by(model_class.id)
+            result = await session.execute(query)
+            return jsonify([dict(row) for row in result.mappings()])
+
+        return await self.cached(render)
+
+    def stream(self, session, model_class, fmt, fields):
+        json_provider = current_app.json
+        query = stream_query(model_class, fields)
+
+        async def chunks():
+            result = await session.stream(query)
+            first = True
+            async for batch in result.mappings().partitions():
+                yield stream_chunk(json_provider, batch, fmt, first)
+                first = False
+            yield stream_end(fmt, first)
+
+        return AsyncStream(stream_mimetype(fmt), chunks())
+
+    async def entity(self, session, collection, entity_id):
+        model_class = CATALOG_MODELS[collection]
+        query = catalog_select(model_class, parse_fields(model_class))
+
+        async def render():
+            result = await session.execute(query.where(model_class.id == entity_id))
+            row = result.mappings().first()
+            if row is None:
+                raise NotFound()
+            return jsonify(dict(row))
+
+        return await self.cached(render)
+
+    async def favorites(self, session):
+        # The checks of @jwt_required(); a user cache miss is a blocking
+        # SELECT, so it runs in a worker thread (with this request's context)
+        await asyncio.to_thread(verify_jwt_in_request)
+        result = await session.scalars(
+            Favorite.select_for_user(current_user.id).order_by(Favorite.id)
+        )
+        return jsonify([fav.serialize() for fav in result])
+
+
+def create_asgi_app(config=None):
+    return AsyncReadAPI(create_app(config))
+
+
+application = create_asgi_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(application, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
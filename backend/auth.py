@@ -0,0 +1,77 @@
+"""
+JWT user loading backed by a small cache of active users.
+
+Protected routes read flask_jwt_extended's current_user instead of querying
+User themselves. Cache hits are merged into the request session without
+touching the database. Cached entries are dropped after a commit that
+updates or deletes the user, and expire after USER_CACHE_TTL seconds so
+changes made in other gunicorn workers are picked up.
+"""
+
+from cache import LRUCache
+from flask import jsonify
+from models import User, db
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+user_cache = LRUCache()
+
+
+def snapshot_user(user):
+    """Detached copy of a loaded user that can be merged without a SELECT"""
+    clone = User(
+        email=user.email,
+        password=user.password,
+        is_active=user.is_active,
+        created_at=user.created_at,
+    )
+    clone.id = user.id
+    make_transient_to_detached(clone)
+    return clone
+
+
+def load_user(user_id):
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return db.session.merge(cached, load=False)
+    user = db.session.get(User, user_id)
+    if user is not None and user.is_active:
+        user_cache.set(user_id, snapshot_user(user))
+    return user
+
+
+def setup_user_loader(app, jwt):
+    app.config.setdefault("USER_CACHE_SIZE", 1024)
+    app.config.setdefault("USER_CACHE_TTL", 30)
+    user_cache.max_entries = app.config["USER_CACHE_SIZE"]
+    user_cache.ttl = app.config["USER_CACHE_TTL"]
+
+    @jwt.user_lookup_loader
+    def user_lookup(jwt_header, jwt_data):
+        try:
+            user_id = int(jwt_data[app.config["JWT_IDENTITY_CLAIM"]])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return load_user(user_id)
+
+    @jwt.user_lookup_error_loader
+    def user_not_found(jwt_header, jwt_data):
+        return jsonify({"message": "User not found"}), 404
+
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault("users_changed", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(session):
+    for user_id in session.info.pop("users_changed", ()):
+        user_cache.pop(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("users_changed", None)
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Star Wars API (query-count checks live in tests/).
+
+Run from the backend directory, e.g. `python -m benchmarks.suite`.
+"""
@@ -0,0 +1,131 @@
+"""
+Concurrent-connection throughput of the read API: threaded gunicorn workers
+vs the async ASGI app under uvicorn.
+
+    python -m benchmarks.asgi_throughput --scale 100k --workers 4 \
+        --connections 8,64,256 --duration 10
+
+Both servers get the same number of worker processes and serve the same
+seeded SQLite file. For each connection count, that many client threads
+request a mix of catalog pages, details and favorites lists for --duration
+seconds; the result is requests/s and latency percentiles per server.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from flask_jwt_extended import create_access_token
+from models import db
+
+from benchmarks.common import latency_stats, make_app
+from benchmarks.seed import FAVORITES_PER_USER, parse_scale, seed_dataset
+from benchmarks.suite import BENCH_SECRET, HTTPTransport
+
+
+def read_paths(size, count, seed=7):
+    """A shuffled mix of page, detail and favorites requests"""
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        collection = rng.choice(("people", "planets", "vehicles"))
+        paths.append(
+            rng.choice(
+                (
+                    f"/api/{collection}?limit=50",
+                    f"/api/{collection}/{rng.randint(1, size)}",
+                    "/api/users/favorites",
+                )
+            )
+        )
+    return paths
+
+
+def run(transport, paths, headers, connections, duration):
+    samples, errors = [], []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def client(offset):
+        i = offset
+        while not stop.is_set():
+            path = paths[i % len(paths)]
+            i += connections
+            start = time.perf_counter()
+            status = transport("GET", path, headers, None)
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples.append(elapsed)
+                if status != 200:
+                    errors.append(status)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(connections)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    stats = latency_stats(samples, duration)
+    stats["errors"] = len(errors)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", default="100k")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--connections", default="8,64,256")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--no-cache", action="store_true", help="disable the response cache"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    size = parse_scale(args.scale)
+    config = {"RESPONSE_CACHE_ENABLED": not args.no_cache}
+    fd, db_path = tempfile.mkstemp(suffix=".db", prefix="starwars-bench-")
+    os.close(fd)
+    app = make_app(db_path, JWT_SECRET_KEY=BENCH_SECRET, **config)
+    with app.app_context():
+        seed_dataset(size)
+        users = max(size // FAVORITES_PER_USER, 1)
+        token = create_access_token(identity=str(users // 2 or 1))
+        db.session.remove()
+    headers = {"Authorization": f"Bearer {token}"}
+    paths = read_paths(size, 10_000)
+
+    results = {}
+    try:
+        for server in ("gunicorn", "uvicorn"):
+            transport = HTTPTransport(db_path, args.workers, config, server)
+            try:
+                for connections in map(int, args.connections.split(",")):
+                    stats = run(transport, paths, headers, connections, args.duration)
+                    results[f"{server} x{connections}"] = stats
+                    print(
+                        f"{server:<9} {connections:>4} connections"
+                        f"  {stats['throughput_rps']:>8.0f} req/s"
+                        f"  p50 {stats['p50_ms']:>7.2f}ms"
+                        f"  p99 {stats['p99_ms']:>8.2f}ms"
+                        f"  errors {stats['errors']}"
+                    )
+            finally:
+                transport.close()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Rows/sec of the catalog read path: ORM + serialize() vs Core rows, with
+the stdlib JSON encoder vs orjson.
+
+    python -m benchmarks.catalog_serialization --rows 100000 --repeat 5
+
+Each variant reads the whole people table and renders the JSON response
+body; the best of --repeat runs is reported. The "endpoint" row times
+GET /api/people end to end through the test client with the response
+cache disabled. Every variant must produce the same bytes.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from flask.json.provider import DefaultJSONProvider
+from json_provider import FastJSONProvider, orjson
+from models import People, api_columns, db
+
+from benchmarks.common import make_app
+
+
+def seed(rows):
+    db.session.execute(
+        db.insert(People),
+        [
+            {
+                "name": f"Person {i}",
+                "gender": "female" if i % 2 else "male",
+                "birth_year": f"{i % 100}BBY",
+                "image_url": f"https://starwars-visualguide.com/assets/img/characters/{i}.jpg",
+            }
+            for i in range(rows)
+        ],
+    )
+    db.session.commit()
+
+
+def orm_rows():
+    return [p.serialize() for p in People.query.order_by(People.id).all()]
+
+
+def core_rows():
+    query = db.select(*api_columns(People)).order_by(People.id)
+    return [dict(row) for row in db.session.execute(query).mappings()]
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="starwars-bench-") as directory:
+        db_path = os.path.join(directory, "bench.db")
+        app = make_app(db_path, RESPONSE_CACHE_ENABLED=False)
+        client = app.test_client()
+        with app.app_context():
+            seed(args.rows)
+            stdlib = DefaultJSONProvider(app)
+            fast = FastJSONProvider(app)
+            variants = {
+                "orm + stdlib json": lambda: stdlib.response(orm_rows()).get_data(),
+                "core + stdlib json": lambda: stdlib.response(core_rows()).get_data(),
+                "core + orjson": lambda: fast.response(core_rows()).get_data(),
+            }
+            results = {name: best_of(args.repeat, fn) for name, fn in variants.items()}
+            results["endpoint"] = best_of(
+                args.repeat, lambda: client.get("/api/people").get_data()
+            )
+            db.session.remove()
+            db.engine.dispose()
+
+    if orjson is None:
+        print("orjson is not installed, core + orjson falls back to the stdlib")
+    bodies = {body for _, body in results.values()}
+    for name, (elapsed, _) in results.items():
+        print(
+            f"{name:<20} {args.rows / elapsed:>12,.0f} rows/s  ({elapsed * 1000:.0f}ms)"
+        )
+    print("identical output" if len(bodies) == 1 else "OUTPUT DIFFERS")
+
+
+if __name__ == "__main__":
+    main()
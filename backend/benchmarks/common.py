@@ -0,0 +1,97 @@
+"""
+Shared helpers for the benchmark scripts: a throwaway app/database,
+a SQL statement counter and latency statistics.
+"""
+
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from app import create_app
+from flask_jwt_extended import create_access_token
+from models import User, db
+from search import create_search_index
+from sqlalchemy import event
+
+
+def make_app(db_path=None, **config):
+    """Build the real app against a temporary SQLite file and create the schema"""
+    directory = None
+    if db_path is None:
+        directory = tempfile.TemporaryDirectory(prefix="starwars-bench-")
+        db_path = os.path.join(directory.name, "bench.db")
+    config.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{db_path}")
+    app = create_app(config)
+    if directory is not None:
+        # Lives as long as the app; removed when it is collected or at exit
+        app.extensions["benchmark_directory"] = directory
+    with app.app_context():
+        # The primary only: replicas (READ_REPLICA_URLS) are left as they are
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+    return app
+
+
+def make_user(email="bench@starwars.com"):
+    """Insert an active user and return (user_id, Authorization header)"""
+    user = User(
+        email=email,
+        password="not-a-real-hash",
+        is_active=True,
+        created_at=datetime.utcnow().isoformat(),
+    )
+    db.session.add(user)
+    db.session.commit()
+    token = create_access_token(identity=str(user.id))
+    return user.id, {"Authorization": f"Bearer {token}"}
+
+
+class QueryCounter:
+    """Collects every SQL statement sent to the engine while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine=None):
+    counter = QueryCounter()
+    engine = engine or db.engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def latency_stats(samples, elapsed=None):
+    """mean/p50/p95/p99 in ms for samples in seconds, plus throughput"""
+    if not samples:
+        return {"count": 0}
+    ms = [s * 1000 for s in samples]
+    stats = {
+        "count": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+    }
+    if elapsed:
+        stats["throughput_rps"] = len(ms) / elapsed
+    return stats
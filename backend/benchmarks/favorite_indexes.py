@@ -0,0 +1,143 @@
+"""
+Favorite add/remove latency on a large favorite table, with and without
+its indexes.
+
+    python -m benchmarks.favorite_indexes --rows 1000000 --ops 200
+
+"before" drops the favorite indexes, "after" recreates them; both phases
+run the same routes against the same data. The old read-before-insert
+existence check is timed separately since the add route no longer runs it.
+Commits are not fsynced unless --durable is given, so disk flush latency
+does not drown out the query cost being measured.
+"""
+
+import argparse
+import random
+import time
+
+from models import FAVORITE_TYPES, Favorite, People, Planet, User, Vehicle, db
+from sqlalchemy import event, insert
+
+from benchmarks.common import latency_stats, make_app, make_user
+
+FAVORITES_PER_USER = 100
+CATALOG_SIZE = 1000
+
+
+def seed(rows, chunk=50_000):
+    for model, extra in (
+        (People, {"gender": "n/a", "birth_year": "0BBY"}),
+        (Planet, {"climate": "arid", "population": "0"}),
+        (Vehicle, {"model": "X", "manufacturer": "Y"}),
+    ):
+        db.session.execute(
+            insert(model),
+            [{"name": f"{model.__name__} {i}", **extra} for i in range(CATALOG_SIZE)],
+        )
+    users = max(rows // FAVORITES_PER_USER, 1)
+    db.session.execute(
+        insert(User),
+        [
+            {
+                "email": f"fan{i}@starwars.com",
+                "password": "x",
+                "is_active": True,
+                "created_at": "2025-01-01",
+            }
+            for i in range(users)
+        ],
+    )
+    types = tuple(FAVORITE_TYPES.values())
+    batch = []
+    for n in range(rows):
+        user_id, slot = divmod(n, FAVORITES_PER_USER)
+        batch.append(
+            {
+                "user_id": user_id + 1,
+                "entity_type": types[slot % 3],
+                "entity_id": slot // 3 + 1,
+            }
+        )
+        if len(batch) == chunk:
+            db.session.execute(insert(Favorite), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Favorite), batch)
+    db.session.commit()
+    return users
+
+
+def set_indexes(enabled):
+    for index in Favorite.__table__.indexes:
+        index.drop(db.engine, checkfirst=True)
+        if enabled:
+            index.create(db.engine)
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def disable_fsync(engine):
+    def set_pragma(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+    event.listen(engine, "connect", set_pragma)
+    engine.dispose()
+
+
+def run_phase(app, client, headers, user_id, ops):
+    timings = {"add": [], "remove": [], "exists_check": []}
+    targets = random.sample(range(CATALOG_SIZE // 2, CATALOG_SIZE), ops)
+    for people_id in targets:
+        start = time.perf_counter()
+        response = client.post(f"/api/favorite/people/{people_id}", headers=headers)
+        timings["add"].append(time.perf_counter() - start)
+        assert response.status_code == 201, response.get_json()
+
+        with app.app_context():
+            start = time.perf_counter()
+            Favorite.query.filter_by(
+                user_id=user_id,
+                entity_type=FAVORITE_TYPES["people"],
+                entity_id=people_id,
+            ).first()
+            timings["exists_check"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = client.delete(f"/api/favorite/people/{people_id}", headers=headers)
+        timings["remove"].append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+    return {name: latency_stats(samples) for name, samples in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--durable", action="store_true", help="fsync every commit")
+    args = parser.parse_args()
+
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        if not args.durable:
+            disable_fsync(db.engine)
+        start = time.perf_counter()
+        seed(args.rows)
+        print(f"seeded {args.rows} favorites in {time.perf_counter() - start:.1f}s")
+        user_id, headers = make_user()
+
+    for phase, enabled in (("before", False), ("after", True)):
+        with app.app_context():
+            set_indexes(enabled)
+        results = run_phase(app, client, headers, user_id, args.ops)
+        for name, stats in results.items():
+            row = "  ".join(
+                f"{key[:-3]}={value:7.2f}ms"
+                for key, value in stats.items()
+                if key.endswith("_ms")
+            )
+            print(f"{phase:<6} {name:<12} {row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Catalog latency while a storm of logins is hashing passwords.
+
+    python -m benchmarks.login_storm --logins 16 --readers 4 --duration 10
+
+Serves the app from a threaded local server and hammers /api/auth/login
+while reader threads time GET /api/people. Runs once with hashing inline
+with no cap (PASSWORD_HASH_WORKERS=0) and once capped at --workers
+concurrent hashes, and prints catalog p50/p95/p99 and login outcomes for each.
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime
+
+from models import People, User, db
+from passwords import passwords
+from werkzeug.serving import make_server
+
+from benchmarks.common import latency_stats, make_app
+
+PASSWORD = "usetheforce"
+
+
+def seed(app, catalog_size=200):
+    with app.app_context():
+        for i in range(catalog_size):
+            db.session.add(People(name=f"Person {i}", gender="n/a", birth_year="0BBY"))
+        db.session.add(
+            User(
+                email="luke@jedi.com",
+                password=passwords.hash(PASSWORD),
+                is_active=True,
+                created_at=datetime.utcnow().isoformat(),
+            )
+        )
+        db.session.commit()
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def run_phase(workers, args):
+    app = make_app(
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_QUEUE_TIMEOUT=args.queue_timeout,
+        # Measure the database path, not the response cache
+        RESPONSE_CACHE_ENABLED=False,
+    )
+    seed(app)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    stop = threading.Event()
+    latencies = []
+    logins = Counter()
+
+    def login_loop():
+        credentials = {"email": "luke@jedi.com", "password": PASSWORD}
+        while not stop.is_set():
+            logins[request(f"{base}/api/auth/login", credentials)] += 1
+
+    def reader_loop():
+        while not stop.is_set():
+            start = time.perf_counter()
+            request(f"{base}/api/people?limit=50")
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(args.logins)]
+    threads += [threading.Thread(target=reader_loop) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    return {
+        "catalog": latency_stats(latencies, args.duration),
+        "logins": dict(logins),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=16, help="login threads")
+    parser.add_argument("--readers", type=int, default=4, help="catalog threads")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=1, help="concurrent hashes")
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    for label, workers in (("uncapped", 0), ("capped", args.workers)):
+        result = run_phase(workers, args)
+        print(f"{label:<6} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
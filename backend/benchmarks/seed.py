@@ -0,0 +1,120 @@
+"""
+Seeded benchmark datasets.
+
+A scale of N gives N people, N planets and N vehicles, N // 10 users and
+N favorites (ten per user). Everything is written with chunked Core bulk
+inserts, and every user shares one pre-computed password hash so seeding
+never waits on scrypt.
+"""
+
+import time
+
+from models import FAVORITE_TYPES, Favorite, People, Planet, User, Vehicle, db
+from passwords import passwords
+from popularity import rebuild_counts
+from sqlalchemy import insert
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SEED_PASSWORD = "usetheforce"
+FAVORITES_PER_USER = 10
+CHUNK = 20_000
+
+IMAGE_PREFIX = "https://starwars-visualguide.com/assets/img"
+
+
+def parse_scale(value):
+    """Accept a named scale (1k, 100k, 1m) or a plain row count"""
+    return SCALES.get(value.lower()) or int(value)
+
+
+def _bulk_insert(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == CHUNK:
+            db.session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+
+
+def seed_dataset(size):
+    """Fill an empty database; returns row counts per table"""
+    start = time.perf_counter()
+    _bulk_insert(
+        People,
+        (
+            {
+                "name": f"Person {i}",
+                "gender": "female" if i % 2 else "male",
+                "birth_year": f"{i % 100}BBY",
+                "image_url": f"{IMAGE_PREFIX}/characters/{i}.jpg",
+            }
+            for i in range(1, size + 1)
+        ),
+    )
+    _bulk_insert(
+        Planet,
+        (
+            {
+                "name": f"Planet {i}",
+                "climate": ("arid", "temperate", "frozen", "murky")[i % 4],
+                "population": str(i * 1000),
+                "image_url": f"{IMAGE_PREFIX}/planets/{i}.jpg",
+            }
+            for i in range(1, size + 1)
+        ),
+    )
+    _bulk_insert(
+        Vehicle,
+        (
+            {
+                "name": f"Vehicle {i}",
+                "model": f"Model {i % 50}",
+                "manufacturer": ("Incom", "Kuat", "Corellia", "Sienar")[i % 4],
+                "image_url": f"{IMAGE_PREFIX}/vehicles/{i}.jpg",
+            }
+            for i in range(1, size + 1)
+        ),
+    )
+
+    users = max(size // FAVORITES_PER_USER, 1)
+    password = passwords.hash(SEED_PASSWORD)
+    _bulk_insert(
+        User,
+        (
+            {
+                "email": f"fan{i}@starwars.com",
+                "password": password,
+                "is_active": True,
+                "created_at": "2025-01-01T00:00:00",
+            }
+            for i in range(1, users + 1)
+        ),
+    )
+
+    types = tuple(FAVORITE_TYPES.values())
+
+    def favorites():
+        for n in range(size):
+            user, slot = divmod(n, FAVORITES_PER_USER)
+            # Same-type slots of one user map to distinct consecutive ids
+            yield {
+                "user_id": user + 1,
+                "entity_type": types[slot % 3],
+                "entity_id": (n // 3) % size + 1,
+            }
+
+    _bulk_insert(Favorite, favorites())
+    db.session.commit()
+    # Core inserts skip the session hooks that keep the counters in step
+    rebuild_counts()
+    elapsed = time.perf_counter() - start
+    return {
+        "people": size,
+        "planets": size,
+        "vehicles": size,
+        "users": users,
+        "favorites": size,
+        "seconds": round(elapsed, 2),
+    }
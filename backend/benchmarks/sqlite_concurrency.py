@@ -0,0 +1,103 @@
+"""
+Mixed read/write concurrency on SQLite, rollback journal vs tuned WAL.
+
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 2 --duration 10
+
+Reader threads list favorites while writer threads add and remove them,
+all through the Flask test client against a file database. The baseline
+phase uses SQLite's defaults (journal_mode=DELETE, synchronous=FULL), the
+tuned phase the connect-time pragmas from database.py.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from database import sqlite_pragmas
+from models import People, db
+
+from benchmarks.common import latency_stats, make_app, make_user
+
+CATALOG_SIZE = 500
+
+
+def run_phase(db_path, pragmas, args):
+    app = make_app(
+        db_path,
+        SQLITE_PRAGMAS=pragmas,
+        RESPONSE_CACHE_ENABLED=False,
+        SQLALCHEMY_ENGINE_OPTIONS={"pool_size": args.readers + args.writers},
+    )
+    client = app.test_client()
+    with app.app_context():
+        db.session.execute(
+            db.insert(People),
+            [
+                {"name": f"Person {i}", "gender": "n/a", "birth_year": "0BBY"}
+                for i in range(CATALOG_SIZE)
+            ],
+        )
+        db.session.commit()
+        headers = [make_user(f"writer{i}@starwars.com")[1] for i in range(args.writers)]
+        # Readers list the writers' favorites so they contend on the same rows
+        reader_headers = headers[0] if headers else make_user()[1]
+
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.get("/api/users/favorites", headers=reader_headers)
+            reads.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    def writer(auth):
+        people_id = 0
+        while not stop.is_set():
+            people_id = people_id % CATALOG_SIZE + 1
+            for method in (client.post, client.delete):
+                start = time.perf_counter()
+                response = method(f"/api/favorite/people/{people_id}", headers=auth)
+                writes.append(time.perf_counter() - start)
+                if response.status_code >= 500:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(auth,)) for auth in headers]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+
+    return {
+        "reads": latency_stats(reads, args.duration),
+        "writes": latency_stats(writes, args.duration),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    baseline = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+    for label, pragmas in (("baseline", baseline), ("tuned", sqlite_pragmas())):
+        with tempfile.TemporaryDirectory(prefix="starwars-bench-") as directory:
+            result = run_phase(os.path.join(directory, "bench.db"), pragmas, args)
+        print(f"{label:<8} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Cold-start cost of a worker: building the app and serving its first request.
+
+    python -m benchmarks.startup --runs 20 --output startup.json
+    python -m benchmarks.startup --gunicorn --workers 4 --baseline startup.json
+
+Every run starts a fresh interpreter that imports wsgi.py (which builds the
+app) and sends two requests through the test client, for each variant: the
+full app and an API-only worker without the admin panel and Swagger UI.
+Reported per variant are the p50/p95 of the whole process (interpreter start
+to exit), the import and the first and second request. --gunicorn also
+starts gunicorn with and without --preload and reports the time until it
+answers and the private memory of its workers (Linux only).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from models import db
+
+from benchmarks.common import latency_stats, make_app
+from benchmarks.seed import parse_scale, seed_dataset
+from benchmarks.suite import BACKEND_DIR, HTTPTransport, git_commit
+
+FIRST_PATH = "/api/people?limit=50"
+
+# Variant -> FLASK_* settings
+VARIANTS = {
+    "full": {},
+    "api-only": {"ADMIN_ENABLED": False, "SWAGGER_ENABLED": False},
+}
+
+CHILD = f"""
+import json, time
+start = time.perf_counter()
+import wsgi
+timings = {{"import_ms": (time.perf_counter() - start) * 1000}}
+client = wsgi.application.test_client()
+for name in ("first_request_ms", "second_request_ms"):
+    start = time.perf_counter()
+    status = client.get({FIRST_PATH!r}).status_code
+    timings[name] = (time.perf_counter() - start) * 1000
+    assert status == 200, status
+print(json.dumps(timings))
+"""
+
+
+def server_env(db_path, config):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    for key, value in config.items():
+        env[f"FLASK_{key}"] = json.dumps(value)
+    return env
+
+
+def cold_start(env):
+    """Timings of one fresh interpreter, in ms"""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    timings = json.loads(output)
+    timings["process_ms"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def private_mb(pid):
+    """Memory only this process maps (Private_Clean + Private_Dirty)"""
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        fields = dict(line.split(":", 1) for line in fh if ":" in line)
+    kb = sum(int(fields[key].split()[0]) for key in ("Private_Clean", "Private_Dirty"))
+    return kb / 1024
+
+
+def worker_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as fh:
+        return [int(child) for child in fh.read().split()]
+
+
+def gunicorn_start(db_path, workers, preload):
+    """Time until gunicorn answers, and its workers' private memory"""
+    extra_env = {"GUNICORN_CMD_ARGS": "--preload" if preload else ""}
+    start = time.perf_counter()
+    transport = HTTPTransport(db_path, workers, {}, "gunicorn", extra_env)
+    ready_ms = (time.perf_counter() - start) * 1000
+    try:
+        memory = None
+        if os.path.exists(f"/proc/{transport.process.pid}/smaps_rollup"):
+            memory = sum(map(private_mb, worker_pids(transport.process.pid)))
+        return {"ready_ms": ready_ms, "worker_private_mb": memory}
+    finally:
+        transport.close()
+
+
+def compare(results, baseline):
+    print(
+        f"\n{'variant':<26}{'process':>10}{'import':>10}{'first':>10}   p50 vs baseline"
+    )
+    for name, stats in results["variants"].items():
+        old = baseline.get("variants", {}).get(name)
+        if not old:
+            print(f"{name:<26}{'new':>10}")
+            continue
+        deltas = [
+            (stats[key]["p50_ms"] - old[key]["p50_ms"]) / old[key]["p50_ms"] * 100
+            for key in ("process_ms", "import_ms", "first_request_ms")
+        ]
+        print(f"{name:<26}" + "".join(f"{d:>+9.1f}%" for d in deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", default="1k")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--gunicorn", action="store_true", help="also time gunicorn with --preload"
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare to")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".db", prefix="starwars-bench-")
+    os.close(fd)
+    app = make_app(db_path)
+    with app.app_context():
+        seed_dataset(parse_scale(args.scale))
+        db.session.remove()
+
+    results = {
+        "meta": {
+            "scale": args.scale,
+            "runs": args.runs,
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+        },
+        "variants": {},
+        "gunicorn": {},
+    }
+    try:
+        for name, config in VARIANTS.items():
+            env = server_env(db_path, config)
+            runs = [cold_start(env) for _ in range(args.runs)]
+            stats = {
+                key: latency_stats([run[key] / 1000 for run in runs]) for key in runs[0]
+            }
+            results["variants"][name] = stats
+            print(
+                f"{name:<10}"
+                + "".join(
+                    f"  {key[:-3]} p50 {stats[key]['p50_ms']:>6.1f}ms"
+                    f" p95 {stats[key]['p95_ms']:>6.1f}ms"
+                    for key in ("process_ms", "import_ms", "first_request_ms")
+                )
+            )
+        if args.gunicorn:
+            for preload in (False, True):
+                name = "preload" if preload else "no preload"
+                stats = gunicorn_start(db_path, args.workers, preload)
+                results["gunicorn"][name] = stats
+                memory = stats["worker_private_mb"]
+                print(
+                    f"gunicorn {name:<10}  ready {stats['ready_ms']:>7.1f}ms"
+                    + (f"  worker private memory {memory:.1f}MB" if memory else "")
+                )
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            compare(results, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Per-route latency and throughput for the whole API.
+
+    python -m benchmarks.suite --scale 100k --mode client --output run.json
+    python -m benchmarks.suite --scale 100k --mode http --workers 4 \
+        --concurrency 16 --baseline run.json
+
+The app is built with create_app() against a temporary SQLite file seeded
+by benchmarks.seed at the chosen scale (1k, 100k, 1m or a row count).
+--mode client drives the Flask test client in-process; --mode http starts
+gunicorn (or the ASGI app under uvicorn with --server uvicorn) on the same
+database, warms every worker up and sends requests from a thread pool with
+one HTTP connection per thread. Every route gets --requests calls spread
+over --concurrency threads (full-table listings and streams get
+--bulk-requests). Results are written as JSON; --baseline prints the
+p50/p99/throughput change per route against an earlier run.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask_jwt_extended import create_access_token
+from models import db
+from utils import encode_cursor
+
+from benchmarks.common import latency_stats, make_app, make_user
+from benchmarks.seed import SEED_PASSWORD, parse_scale, seed_dataset
+
+BENCH_SECRET = "benchmark-jwt-secret-not-for-production"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Server name -> command line (after "python -m") for workers and a port
+SERVERS = {
+    "gunicorn": lambda workers, port: [
+        "gunicorn",
+        "--workers",
+        str(workers),
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+        "wsgi:application",
+    ],
+    "uvicorn": lambda workers, port: [
+        "uvicorn",
+        "--workers",
+        str(workers),
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+        "asgi:application",
+    ],
+}
+
+
+class Route:
+    """One benchmarked request; path and body are built per call index"""
+
+    def __init__(self, name, method, path, body=None, auth=None, bulk=False):
+        self.name = name
+        self.method = method
+        self.path = path if callable(path) else (lambda i, p=path: p)
+        self.body = body
+        self.auth = auth
+        self.bulk = bulk
+
+
+def build_routes(size, requests, reader, writer):
+    """Every API route, with ids spread over the seeded catalog"""
+    rng = random.Random(42)
+    ids = [rng.randint(1, size) for _ in range(requests)]
+    signups = itertools.count()
+    cursor = encode_cursor(size // 2)
+    # Favorite adds and removes walk the same ids so each remove hits a row
+    fav_ids = [i % size + 1 for i in range(requests)]
+    batches = [
+        [{"type": "vehicle", "id": (i * 10 + j) % size + 1} for j in range(10)]
+        for i in range(requests)
+    ]
+
+    routes = [Route("index", "GET", "/")]
+    for collection in ("people", "planets", "vehicles"):
+        routes += [
+            Route(f"{collection} list", "GET", f"/api/{collection}", bulk=True),
+            Route(
+                f"{collection} stream",
+                "GET",
+                f"/api/{collection}?stream=ndjson",
+                bulk=True,
+            ),
+            Route(f"{collection} page", "GET", f"/api/{collection}?limit=50"),
+            Route(
+                f"{collection} page after",
+                "GET",
+                f"/api/{collection}?limit=50&after={cursor}",
+            ),
+            Route(
+                f"{collection} detail",
+                "GET",
+                lambda i, c=collection: f"/api/{c}/{ids[i]}",
+            ),
+            Route(
+                f"{collection} ids",
+                "GET",
+                lambda i, c=collection: f"/api/{c}?ids="
+                + ",".join(str(ids[(i + k) % requests]) for k in range(20)),
+            ),
+            Route(
+                f"{collection} detail fields",
+                "GET",
+                lambda i, c=collection: f"/api/{c}/{ids[i]}?fields=id,name",
+            ),
+        ]
+    routes += [
+        Route("search", "GET", lambda i: f"/api/search?q=Person {ids[i]}"),
+        Route("search typed", "GET", "/api/search?q=arid&type=planet&limit=20"),
+        Route("popular", "GET", "/api/popular?limit=10"),
+        Route("catalog", "GET", "/api/catalog", bulk=True),
+        Route("catalog signed in", "GET", "/api/catalog", auth=reader, bulk=True),
+        Route("popular typed", "GET", "/api/popular?type=planet&limit=50"),
+        Route("changes", "GET", "/api/changes?limit=500"),
+        Route("changes since", "GET", "/api/changes?since=0"),
+        Route(
+            "signup",
+            "POST",
+            "/api/auth/signup",
+            body=lambda i: {
+                "email": f"signup{next(signups)}@starwars.com",
+                "password": SEED_PASSWORD,
+            },
+        ),
+        Route(
+            "login",
+            "POST",
+            "/api/auth/login",
+            body=lambda i: {"email": "fan1@starwars.com", "password": SEED_PASSWORD},
+        ),
+        Route("protected", "GET", "/api/protected", auth=reader),
+        Route("favorites list", "GET", "/api/users/favorites", auth=reader),
+        Route(
+            "favorite add",
+            "POST",
+            lambda i: f"/api/favorite/planet/{fav_ids[i]}",
+            auth=writer,
+        ),
+        Route(
+            "favorite remove",
+            "DELETE",
+            lambda i: f"/api/favorite/planet/{fav_ids[i]}",
+            auth=writer,
+        ),
+        Route(
+            "favorites batch add",
+            "POST",
+            "/api/users/favorites/batch",
+            body=lambda i: {"items": batches[i]},
+            auth=writer,
+        ),
+        Route(
+            "favorites batch remove",
+            "DELETE",
+            "/api/users/favorites/batch",
+            body=lambda i: {"items": batches[i]},
+            auth=writer,
+        ),
+    ]
+    return routes
+
+
+class ClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def __call__(self, method, path, headers, body):
+        response = self.client.open(path, method=method, headers=headers, json=body)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """A local server on the seeded database; one connection per thread"""
+
+    def __init__(self, db_path, workers, config, server="gunicorn", extra_env=None):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{db_path}",
+            JWT_SECRET_KEY=BENCH_SECRET,
+            **(extra_env or {}),
+        )
+        for key, value in config.items():
+            env[f"FLASK_{key}"] = json.dumps(value)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", *SERVERS[server](workers, self.port)],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        self.local = threading.local()
+        self._wait_ready()
+        # The first request in each worker pays for imports and connecting
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda _: self("GET", "/", {}, None), range(workers * 4)))
+
+    def _wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit("server exited during startup")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), 0.2):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise SystemExit("server did not start listening")
+
+    def __call__(self, method, path, headers, body):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(
+                "127.0.0.1", self.port, timeout=300
+            )
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            conn.request(method, path.replace(" ", "%20"), payload, headers)
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            return 0
+        return response.status
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def run_route(transport, route, requests, concurrency):
+    headers = route.auth or {}
+    samples, errors = [], []
+    lock = threading.Lock()
+
+    def call(i):
+        body = route.body(i) if route.body else None
+        path = route.path(i)
+        start = time.perf_counter()
+        status = transport(route.method, path, headers, body)
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.append(elapsed)
+            if not 200 <= status < 300:
+                errors.append(status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    stats = latency_stats(samples, time.perf_counter() - start)
+    stats["errors"] = len(errors)
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    print(f"\n{'route':<26}{'p50':>10}{'p99':>10}{'rps':>10}   vs baseline")
+    for name, stats in results["routes"].items():
+        old = baseline.get("routes", {}).get(name)
+        if not old or not old.get("count") or not stats.get("count"):
+            print(f"{name:<26}{'new':>10}")
+            continue
+        deltas = [
+            (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            for key in ("p50_ms", "p99_ms", "throughput_rps")
+        ]
+        print(f"{name:<26}" + "".join(f"{d:>+9.1f}%" for d in deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", default="1k")
+    parser.add_argument("--mode", choices=("client", "http"), default="client")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--bulk-requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--server", choices=list(SERVERS), default="gunicorn")
+    parser.add_argument("--routes", help="comma-separated route names to run")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="disable the response cache"
+    )
+    parser.add_argument(
+        "--snapshot", action="store_true", help="serve lists from a catalog snapshot"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare to")
+    args = parser.parse_args()
+
+    size = parse_scale(args.scale)
+    config = {"RESPONSE_CACHE_ENABLED": not args.no_cache}
+    # Removed in the finally below, or at exit if seeding fails
+    directory = tempfile.TemporaryDirectory(prefix="starwars-bench-")
+    db_path = os.path.join(directory.name, "bench.db")
+    if args.snapshot:
+        config["CATALOG_SNAPSHOT_PATH"] = db_path + ".snapshot"
+    app = make_app(db_path, JWT_SECRET_KEY=BENCH_SECRET, **config)
+    with app.app_context():
+        counts = seed_dataset(size)
+        print(f"seeded {json.dumps(counts)}")
+        reader = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+        writer = make_user("bench-writer@starwars.com")[1]
+        db.session.remove()
+
+    routes = build_routes(size, args.requests, reader, writer)
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        routes = [route for route in routes if route.name in wanted]
+
+    if args.mode == "http":
+        transport = HTTPTransport(db_path, args.workers, config, args.server)
+    else:
+        transport = ClientTransport(app)
+    results = {
+        "meta": {
+            "scale": args.scale,
+            "rows": size,
+            "mode": args.mode,
+            "requests": args.requests,
+            "bulk_requests": args.bulk_requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers if args.mode == "http" else None,
+            "server": args.server if args.mode == "http" else None,
+            "response_cache": not args.no_cache,
+            "catalog_snapshot": args.snapshot,
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+        },
+        "routes": {},
+    }
+    try:
+        for route in routes:
+            requests = args.bulk_requests if route.bulk else args.requests
+            stats = run_route(transport, route, requests, args.concurrency)
+            results["routes"][route.name] = stats
+            print(
+                f"{route.name:<26} p50 {stats['p50_ms']:>8.2f}ms"
+                f"  p99 {stats['p99_ms']:>8.2f}ms"
+                f"  {stats['throughput_rps']:>8.1f} req/s"
+                f"  errors {stats['errors']}"
+            )
+    finally:
+        transport.close()
+        directory.cleanup()
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            compare(results, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+In-process response cache for the public catalog endpoints.
+
+Responses are cached per endpoint and arguments with a strong ETag (a hash
+of the body, so every worker and restart agrees on it), so repeat requests
+are answered from memory or with a 304. They are sent with
+Cache-Control: no-cache, so browsers revalidate them on every use instead
+of guessing a freshness lifetime. Entries also keep the gzip/brotli bodies they have been sent with,
+so a catalog list is compressed once per data change. The whole cache is
+dropped after any commit that touches People, Planet or Vehicle rows.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from compression import apply_encoding, compress, negotiate
+from flask import current_app, make_response, request
+from models import People, Planet, Vehicle
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils import stream_format
+
+CATALOG_MODELS = (People, Planet, Vehicle)
+
+
+class CacheEntry:
+    def __init__(self, body, mimetype, etag):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        # Content-Encoding -> compressed body, filled on first use
+        self.encoded = {}
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with an optional per-entry TTL in seconds"""
+
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            created, value = item
+            if self.ttl and time.monotonic() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._entries.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache(LRUCache):
+    """LRU of serialized responses, dropped wholesale on catalog writes"""
+
+    def __init__(self, max_entries=256, ttl=None):
+        super().__init__(max_entries, ttl)
+        # Bumped on every invalidation so in-flight stale renders are not stored
+        self.generation = 0
+
+    def init_app(self, app):
+        app.config.setdefault("RESPONSE_CACHE_ENABLED", True)
+        app.config.setdefault("RESPONSE_CACHE_SIZE", 256)
+        # Caches are per process; the TTL bounds staleness across gunicorn workers
+        app.config.setdefault("RESPONSE_CACHE_TTL", 60)
+        self.max_entries = app.config["RESPONSE_CACHE_SIZE"]
+        self.ttl = app.config["RESPONSE_CACHE_TTL"]
+        app.extensions["response_cache"] = self
+
+    def set(self, key, entry, generation):
+        with self._lock:
+            if generation == self.generation:
+                self._store(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+
+response_cache = ResponseCache()
+
+
+def make_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def cache_key():
+    args = tuple(sorted(request.args.items(multi=True)))
+    view_args = tuple(sorted((request.view_args or {}).items()))
+    return request.endpoint, view_args, args
+
+
+def build_response(entry):
+    response = make_response(entry.body)
+    response.mimetype = entry.mimetype
+    response.set_etag(entry.etag)
+    response.cache_control.no_cache = True
+    encoding = negotiate(len(entry.body), entry.mimetype)
+    if encoding:
+        body = entry.encoded.get(encoding)
+        if body is None:
+            body = entry.encoded[encoding] = compress(entry.body, encoding)
+        apply_encoding(response, encoding, body)
+    return response.make_conditional(request)
+
+
+def store_response(key, response, generation):
+    """Cache a rendered 200 response and return it as served from the cache"""
+    body = response.get_data()
+    entry = CacheEntry(body, response.mimetype, make_etag(body))
+    response_cache.set(key, entry, generation)
+    return build_response(entry)
+
+
+def cached_body(key, render, mimetype="application/json"):
+    """CacheEntry for a body that is part of a larger response.
+
+    render() returns the body bytes; it only runs on a miss. The entry's
+    ETag doubles as a version of that body.
+    """
+    enabled = current_app.config.get("RESPONSE_CACHE_ENABLED", True)
+    entry = response_cache.get(key) if enabled else None
+    if entry is None:
+        generation = response_cache.generation
+        body = render()
+        entry = CacheEntry(body, mimetype, make_etag(body))
+        if enabled:
+            response_cache.set(key, entry, generation)
+    return entry
+
+
+def cached_response(view):
+    """Serve a GET view from the response cache, honouring If-None-Match"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get("RESPONSE_CACHE_ENABLED", True):
+            return view(*args, **kwargs)
+        # Streamed exports are never buffered, so there is nothing to cache
+        if stream_format(request):
+            return view(*args, **kwargs)
+
+        key = cache_key()
+        entry = response_cache.get(key)
+        if entry is not None:
+            return build_response(entry)
+
+        generation = response_cache.generation
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+
+        return store_response(key, response, generation)
+
+    return wrapper
+
+
+def _touches_catalog(objects):
+    return any(isinstance(obj, CATALOG_MODELS) for obj in objects)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_changes(session, flush_context):
+    changed = (session.new, session.dirty, session.deleted)
+    if any(_touches_catalog(objects) for objects in changed):
+        session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("catalog_changed", False):
+        response_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("catalog_changed", None)
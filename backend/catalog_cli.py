@@ -0,0 +1,289 @@
+"""
+flask catalog import / export: bulk load and dump people, planets and vehicles.
+
+    flask catalog import people.ndjson --type people --batch-size 5000
+    flask catalog export --type planets --format csv -o planets.csv
+
+Imports stream-parse JSON arrays, NDJSON or CSV (picked from the file
+extension unless --format is given) and upsert BATCH_SIZE rows per
+statement: rows with an id replace the existing row with that id, rows
+without one are inserted. Each batch is committed on its own, so memory
+stays bounded and an interrupted import keeps what it already wrote.
+Every batch takes a new catalog version for its rows (see changes.py), so
+clients syncing through /api/changes pick up imported rows too.
+Exports read the table with yield_per and write rows as they arrive.
+
+    flask catalog rebuild-counts
+
+recomputes the favorite counters behind /api/popular (see popularity.py).
+
+    flask catalog snapshot
+
+rebuilds the shared catalog snapshot (see snapshot.py), which imports also
+do when CATALOG_SNAPSHOT_PATH is set.
+"""
+
+import csv
+import json
+import os
+import time
+
+import click
+from changes import next_version
+from flask import current_app
+from flask.cli import AppGroup
+from models import People, Planet, Vehicle, api_columns, db
+from popularity import rebuild_counts
+from snapshot import catalog_snapshot
+from sqlalchemy import insert, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+CATALOG_TYPES = {"people": People, "planets": Planet, "vehicles": Vehicle}
+FORMATS = ("json", "ndjson", "csv")
+BATCH_SIZE = 5000
+READ_CHUNK = 1 << 16
+
+catalog_cli = AppGroup("catalog", help="Bulk import and export of the catalog.")
+
+
+def detect_format(filename, fmt):
+    if fmt:
+        return fmt
+    for candidate in FORMATS:
+        if filename.endswith(f".{candidate}"):
+            return candidate
+    if filename.endswith(".jsonl"):
+        return "ndjson"
+    raise click.UsageError("Cannot tell the format from the file name, use --format")
+
+
+def iter_json_array(fh):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof, started = "", 0, False, False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = fh.read(READ_CHUNK)
+        buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+
+    while True:
+        skip = " \t\r\n," if started else " \t\r\n"
+        while position < len(buffer) and buffer[position] in skip:
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise click.ClickException("Unexpected end of JSON input")
+            fill()
+        elif not started:
+            if buffer[position] != "[":
+                raise click.ClickException("Expected a JSON array")
+            started = True
+            position += 1
+        elif buffer[position] == "]":
+            return
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise click.ClickException("Invalid JSON input")
+                fill()
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(buffer) and not eof:
+                fill()
+                continue
+            position = end
+            yield item
+
+
+def read_rows(fh, fmt):
+    if fmt == "csv":
+        for row in csv.DictReader(fh):
+            yield {key: (value if value != "" else None) for key, value in row.items()}
+    elif fmt == "ndjson":
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from iter_json_array(fh)
+
+
+def clean_row(model, row, line):
+    """Keep the model's columns; the id, when present, must be an integer"""
+    if not isinstance(row, dict):
+        raise click.ClickException(f"Row {line}: expected an object")
+    columns = {column.name for column in api_columns(model)}
+    values = {key: value for key, value in row.items() if key in columns}
+    if values.get("id") is not None:
+        try:
+            values["id"] = int(values["id"])
+        except (TypeError, ValueError):
+            raise click.ClickException(f"Row {line}: invalid id {values['id']!r}")
+    else:
+        values.pop("id", None)
+    if not values.get("name"):
+        raise click.ClickException(f"Row {line}: name is required")
+    return values
+
+
+def upsert_statement(model):
+    """INSERT ... ON CONFLICT (id) DO UPDATE for the current dialect"""
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    updated = [column.name for column in table.columns if column.name != "id"]
+    if dialect == "mysql":
+        statement = mysql.insert(table)
+        return statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in updated}
+        )
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    if dialect not in dialects:
+        raise click.ClickException(f"Upserts are not supported on {dialect}")
+    statement = dialects[dialect].insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=["id"],
+        set_={name: statement.excluded[name] for name in updated},
+    )
+
+
+def write_batch(model, batch):
+    # executemany needs the same keys in every row of one statement
+    columns = [column.name for column in api_columns(model)]
+    version = {"version": next_version(db.session.connection())}
+    with_id = [
+        {**{name: row.get(name) for name in columns}, **version}
+        for row in batch
+        if "id" in row
+    ]
+    without_id = [
+        {**{name: row.get(name) for name in columns if name != "id"}, **version}
+        for row in batch
+        if "id" not in row
+    ]
+    if with_id:
+        db.session.execute(upsert_statement(model), with_id)
+    if without_id:
+        db.session.execute(insert(model), without_id)
+    db.session.commit()
+
+
+def sync_sequence(model):
+    """Move a Postgres id sequence past explicitly imported ids"""
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    table = model.__table__.name
+    db.session.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"coalesce(max(id), 1)) FROM {table}"
+        )
+    )
+    db.session.commit()
+
+
+def report(label, count, start, final=False):
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0
+    click.echo(f"\r{label}: {count:,} rows ({rate:,.0f} rows/s)", err=True, nl=final)
+
+
+@catalog_cli.command("import")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option(
+    "--type", "entity_type", type=click.Choice(list(CATALOG_TYPES)), required=True
+)
+@click.option("--format", "fmt", type=click.Choice(FORMATS))
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+def import_catalog(source, entity_type, fmt, batch_size):
+    """Upsert catalog rows from a JSON, NDJSON or CSV file ("-" for stdin)."""
+    model = CATALOG_TYPES[entity_type]
+    fmt = detect_format(source.name, fmt)
+    start = time.perf_counter()
+    count = 0
+    batch = []
+    for line, row in enumerate(read_rows(source, fmt), start=1):
+        batch.append(clean_row(model, row, line))
+        if len(batch) >= batch_size:
+            write_batch(model, batch)
+            count += len(batch)
+            batch = []
+            report(entity_type, count, start)
+    if batch:
+        write_batch(model, batch)
+        count += len(batch)
+    sync_sequence(model)
+    report(entity_type, count, start, final=True)
+    # Core upserts bypass the session hooks that rebuild the snapshot
+    if catalog_snapshot.path is not None:
+        catalog_snapshot.rebuild()
+
+
+@catalog_cli.command("export")
+@click.option(
+    "--type", "entity_type", type=click.Choice(list(CATALOG_TYPES)), required=True
+)
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="ndjson")
+@click.option("-o", "--output", type=click.File("w", encoding="utf-8"), default="-")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+def export_catalog(entity_type, fmt, output, batch_size):
+    """Write every row of one catalog table, ordered by id."""
+    model = CATALOG_TYPES[entity_type]
+    columns = api_columns(model)
+    query = (
+        db.select(*columns).order_by(model.id).execution_options(yield_per=batch_size)
+    )
+    json_provider = current_app.json
+
+    def dumps(row):
+        return json_provider.dumps(dict(row), separators=(",", ":"))
+
+    start = time.perf_counter()
+    count = 0
+    writer = (
+        csv.DictWriter(output, fieldnames=[c.name for c in columns])
+        if fmt == "csv"
+        else None
+    )
+    if writer:
+        writer.writeheader()
+    elif fmt == "json":
+        output.write("[")
+    for batch in db.session.execute(query).mappings().partitions():
+        if writer:
+            writer.writerows(batch)
+        elif fmt == "ndjson":
+            output.write("".join(dumps(row) + "\n" for row in batch))
+        else:
+            prefix = "," if count else ""
+            output.write(prefix + ",".join(dumps(row) for row in batch))
+        count += len(batch)
+        report(entity_type, count, start)
+    if fmt == "json":
+        output.write("]\n")
+    report(entity_type, count, start, final=True)
+
+
+@catalog_cli.command("rebuild-counts")
+def rebuild_favorite_counts():
+    """Recompute the favorite counters behind /api/popular."""
+    start = time.perf_counter()
+    rows = rebuild_counts()
+    elapsed = time.perf_counter() - start
+    click.echo(f"favorite counts: {rows:,} entities in {elapsed:.2f}s", err=True)
+
+
+@catalog_cli.command("snapshot")
+def rebuild_snapshot():
+    """Rebuild the shared catalog snapshot of the list endpoints."""
+    if catalog_snapshot.path is None:
+        raise click.ClickException("CATALOG_SNAPSHOT_PATH is not set")
+    start = time.perf_counter()
+    version = catalog_snapshot.rebuild()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(catalog_snapshot.path)
+    click.echo(
+        f"catalog snapshot: version {version}, {size:,} bytes in {elapsed:.2f}s",
+        err=True,
+    )
@@ -0,0 +1,156 @@
+"""
+Catalog change versions and the delta feed behind /api/changes.
+
+Every transaction that writes People, Planet or Vehicle rows takes the next
+value of the catalog_version counter and stamps it on each row it inserts
+or updates; rows it deletes leave a catalog_tombstone with that version.
+This happens in session hooks, so API writes, admin edits and user cascades
+are all covered. Core bulk writes stamp their rows themselves with
+next_version() (see catalog_cli.py). The counter row stays locked until
+the transaction commits, so versions become visible in increasing order
+and a client that has seen version N only needs the rows above N.
+"""
+
+from models import (
+    FAVORITE_TYPES,
+    CatalogTombstone,
+    CatalogVersion,
+    People,
+    Planet,
+    Vehicle,
+    api_columns,
+    db,
+)
+from sqlalchemy import event, tuple_
+from sqlalchemy.orm import Session
+
+# Change feed type -> model, in the order changes of one version are listed
+CHANGE_TYPES = {"people": People, "planet": Planet, "vehicle": Vehicle}
+TRACKED_MODELS = tuple(CHANGE_TYPES.values())
+TYPE_NAMES = {model: name for name, model in CHANGE_TYPES.items()}
+CHANGE_NAMES = {FAVORITE_TYPES[name]: name for name in CHANGE_TYPES}
+
+
+def next_version(connection):
+    """Increment the catalog version and return it, locking the counter"""
+    counter = CatalogVersion.__table__
+    bumped = connection.execute(
+        counter.update().where(counter.c.id == 1).values(value=counter.c.value + 1)
+    )
+    if not bumped.rowcount:
+        connection.execute(counter.insert().values(id=1, value=1))
+    return connection.scalar(db.select(counter.c.value).where(counter.c.id == 1))
+
+
+def session_version(session):
+    """The version of the session's current transaction, taken on first use"""
+    version = session.info.get("catalog_version")
+    if version is None:
+        version = session.info["catalog_version"] = next_version(session.connection())
+    return version
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_versions(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, TRACKED_MODELS)]
+    changed += [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, TRACKED_MODELS) and session.is_modified(obj)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, TRACKED_MODELS)]
+    if not changed and not deleted:
+        return
+    version = session_version(session)
+    for obj in changed:
+        obj.version = version
+    if deleted:
+        session.info.setdefault("catalog_deleted", []).extend(
+            (FAVORITE_TYPES[TYPE_NAMES[type(obj)]], obj.id) for obj in deleted
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _write_tombstones(session, flush_context):
+    deleted = session.info.pop("catalog_deleted", None)
+    if not deleted:
+        return
+    table = CatalogTombstone.__table__
+    # The connection, not the session, as this runs inside the flush
+    connection = session.connection()
+    # An id can be deleted again after being reinserted; keep the latest
+    connection.execute(
+        table.delete().where(
+            tuple_(table.c.entity_type, table.c.entity_id).in_(deleted)
+        )
+    )
+    version = session.info["catalog_version"]
+    connection.execute(
+        table.insert(),
+        [
+            {"entity_type": code, "entity_id": entity_id, "version": version}
+            for code, entity_id in deleted
+        ],
+    )
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _end_version(session):
+    session.info.pop("catalog_version", None)
+    session.info.pop("catalog_deleted", None)
+
+
+def _after(column_version, column_id, code, cursor):
+    """Keyset condition for rows of one type past (version, type, id)"""
+    version, cursor_code, entity_id = cursor
+    if code > cursor_code:
+        return column_version >= version
+    if code < cursor_code:
+        return column_version > version
+    return tuple_(column_version, column_id) > (version, entity_id)
+
+
+def since_cursor(since):
+    """The cursor just past every change of version since"""
+    return (since, max(CHANGE_NAMES) + 1, 0)
+
+
+def catalog_changes(cursor, limit):
+    """Up to limit changes after cursor = (version, type code, id), in order.
+
+    Each change is (version, type code, id, row), with row None for a
+    delete. One bounded index range read per table, merged in Python.
+    """
+    changes = []
+    for name, model in CHANGE_TYPES.items():
+        code = FAVORITE_TYPES[name]
+        query = (
+            db.select(model.version, *api_columns(model))
+            .where(_after(model.version, model.id, code, cursor))
+            .order_by(model.version, model.id)
+            .limit(limit)
+        )
+        for row in db.session.execute(query).mappings():
+            row = dict(row)
+            changes.append((row.pop("version"), code, row["id"], row))
+    tombstones = CatalogTombstone.__table__.c
+    query = (
+        db.select(tombstones.version, tombstones.entity_type, tombstones.entity_id)
+        .where(
+            tuple_(tombstones.version, tombstones.entity_type, tombstones.entity_id)
+            > cursor
+        )
+        .order_by(tombstones.version, tombstones.entity_type, tombstones.entity_id)
+        .limit(limit)
+    )
+    changes += [(*row, None) for row in db.session.execute(query)]
+    changes.sort(key=lambda change: change[:3])
+    return changes[:limit]
+
+
+def current_version(connection=None):
+    """The latest committed catalog version (0 before any change)"""
+    counter = CatalogVersion.__table__
+    query = db.select(counter.c.value).where(counter.c.id == 1)
+    return (connection or db.session).scalar(query) or 0
@@ -0,0 +1,89 @@
+"""
+gzip / brotli compression of JSON responses negotiated on Accept-Encoding.
+
+Buffered JSON responses of at least COMPRESSION_MIN_SIZE bytes are sent
+with the best encoding the client accepts (brotli when the brotli package
+is installed, else gzip). Cached catalog responses keep their compressed
+bodies in the cache entry (see cache.py), so each is compressed once per
+data change rather than once per request. Compressed responses carry a weak
+ETag, which still matches If-None-Match, and every eligible response gets
+Vary: Accept-Encoding.
+
+Config:
+    COMPRESSION_ENABLED          (default True)
+    COMPRESSION_MIN_SIZE         smallest body worth compressing (default 1024)
+    COMPRESSION_GZIP_LEVEL       1-9 (default 6)
+    COMPRESSION_BROTLI_QUALITY   0-11 (default 5)
+"""
+
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json"}
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(size, mimetype):
+    """Encoding to send a body of this size and type in, or None for identity"""
+    config = current_app.config
+    if (
+        not config.get("COMPRESSION_ENABLED", True)
+        or mimetype not in COMPRESSIBLE_MIMETYPES
+        or size < config.get("COMPRESSION_MIN_SIZE", 1024)
+    ):
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(data, encoding):
+    config = current_app.config
+    if encoding == "br":
+        return brotli.compress(
+            data, quality=config.get("COMPRESSION_BROTLI_QUALITY", 5)
+        )
+    return gzip.compress(
+        data, compresslevel=config.get("COMPRESSION_GZIP_LEVEL", 6), mtime=0
+    )
+
+
+def apply_encoding(response, encoding, body):
+    """Swap in an encoded body; the ETag becomes weak as the bytes differ"""
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+
+
+def init_app(app):
+    app.config.setdefault("COMPRESSION_ENABLED", True)
+    app.config.setdefault("COMPRESSION_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESSION_GZIP_LEVEL", 6)
+    app.config.setdefault("COMPRESSION_BROTLI_QUALITY", 5)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            not app.config["COMPRESSION_ENABLED"]
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.is_streamed
+            or response.direct_passthrough
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        if "Content-Encoding" in response.headers:
+            return response
+        data = response.get_data()
+        encoding = negotiate(len(data), response.mimetype)
+        if encoding:
+            apply_encoding(response, encoding, compress(data, encoding))
+        return response
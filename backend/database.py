@@ -0,0 +1,133 @@
+"""
+Database URI, connection pool and SQLite pragma configuration.
+
+Everything can be set from the environment:
+
+    DATABASE_URL            any SQLAlchemy URI (postgres:// is accepted too)
+    DB_POOL_SIZE            persistent connections per worker (default 5)
+    DB_MAX_OVERFLOW         extra connections under burst (default 10)
+    DB_POOL_RECYCLE         seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING        check connections before use (default 1)
+    SQLITE_JOURNAL_MODE     default WAL, so readers never block on writers
+    SQLITE_SYNCHRONOUS      default NORMAL, safe under WAL and far fewer fsyncs
+    SQLITE_BUSY_TIMEOUT     ms to wait on a locked database (default 5000)
+    SQLITE_MMAP_SIZE        bytes of the file to memory-map (default 256MB)
+    SQLITE_CACHE_SIZE       page cache, negative means KiB (default -65536)
+    READ_REPLICA_URLS       comma-separated replica URIs (see replicas.py)
+
+Pools are emptied in forked children, so an app built before the fork
+(gunicorn --preload) never shares a connection between workers.
+"""
+
+import os
+import weakref
+
+from models import db
+from replicas import replica_binds
+from sqlalchemy import event
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def normalize_uri(uri):
+    # Heroku/Render style URLs use the scheme SQLAlchemy dropped in 1.4
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://") :]
+    return uri
+
+
+def database_uri(app):
+    uri = os.getenv("DATABASE_URL")
+    if not uri:
+        os.makedirs(app.instance_path, exist_ok=True)
+        return "sqlite:///" + os.path.join(app.instance_path, "database.db")
+    return normalize_uri(uri)
+
+
+def read_replica_urls():
+    urls = os.getenv("READ_REPLICA_URLS", "").split(",")
+    return [normalize_uri(url.strip()) for url in urls if url.strip()]
+
+
+def engine_options(uri):
+    options = {
+        "pool_pre_ping": bool(_env_int("DB_POOL_PRE_PING", 1)),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+    }
+    # In-memory SQLite uses a single shared connection, not a sized pool
+    in_memory = uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri
+    if not in_memory:
+        options["pool_size"] = _env_int("DB_POOL_SIZE", 5)
+        options["max_overflow"] = _env_int("DB_MAX_OVERFLOW", 10)
+    return options
+
+
+def sqlite_pragmas():
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT", 5000),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "cache_size": _env_int("SQLITE_CACHE_SIZE", -65536),
+    }
+
+
+def configure_database(app):
+    """Fill in database settings the app config does not already define"""
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", database_uri(app))
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        engine_options(app.config["SQLALCHEMY_DATABASE_URI"]),
+    )
+    app.config.setdefault("SQLITE_PRAGMAS", sqlite_pragmas())
+    app.config.setdefault("READ_REPLICA_URLS", read_replica_urls())
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    binds.update(replica_binds(app.config["READ_REPLICA_URLS"]))
+
+
+def pragma_listener(pragmas):
+    """Engine "connect" listener that runs PRAGMA name=value for each pragma"""
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return set_pragmas
+
+
+def setup_sqlite_pragmas(app):
+    """Apply SQLITE_PRAGMAS to every new connection of the app's SQLite engines"""
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    if not pragmas:
+        return
+
+    set_pragmas = pragma_listener(pragmas)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect", set_pragmas)
+
+
+# Engines of the apps built in this process
+_fork_engines = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    # close=False: the parent still owns those connections
+    for engine in list(_fork_engines):
+        engine.dispose(close=False)
+
+
+# Not available on Windows, which has no fork
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def setup_fork_safety(app):
+    """Give forked children fresh pools for the app's engines"""
+    with app.app_context():
+        _fork_engines.update(db.engines.values())
@@ -0,0 +1,44 @@
+"""
+gunicorn settings picked up automatically when gunicorn runs from backend/.
+
+Workers are threaded (gthread, `threads` request threads each, --threads to
+change it), so a worker keeps answering catalog reads while some of its
+threads hash passwords; passwords.py lets PASSWORD_HASH_WORKERS threads per
+worker hash at once.
+
+With PROMETHEUS_MULTIPROC_DIR set, metric files from a previous run are
+cleared on startup and a dead worker's live gauges are dropped so /metrics
+only aggregates running processes (see metrics.py).
+
+With --preload (or GUNICORN_CMD_ARGS="--preload") the master imports wsgi.py
+once and workers fork from it, sharing its memory copy-on-write; the objects
+loaded by then are frozen out of the garbage collector so collections in the
+workers do not touch, and copy, those pages.
+"""
+
+import gc
+import glob
+import os
+
+worker_class = "gthread"
+threads = 4
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        gc.freeze()
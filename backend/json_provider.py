@@ -0,0 +1,51 @@
+"""
+Flask JSON provider that encodes with orjson when it is installed.
+
+Responses keep the exact bytes Flask's DefaultJSONProvider produces for the
+API's data: sorted keys, compact separators, ASCII-only output and HTTP
+dates for datetimes. Anything orjson would render differently (non-ASCII
+text, non-string keys, indented debug output) goes through the stdlib
+encoder instead. Floats are the one remaining difference: orjson may print
+exponents without a "+" (1e16 instead of 1e+16), which parses the same.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPACT = (",", ":")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def _fast_dumps(self, obj):
+        """orjson bytes for obj, or None when the stdlib must be used"""
+        if orjson is None:
+            return None
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            data = orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return None
+        if self.ensure_ascii and not data.isascii():
+            return None
+        return data
+
+    def dumps(self, obj, **kwargs):
+        # Only the compact form jsonify() uses has an orjson equivalent
+        if kwargs == {"separators": COMPACT}:
+            data = self._fast_dumps(obj)
+            if data is not None:
+                return data.decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.compact or (self.compact is None and not self._app.debug):
+            data = self._fast_dumps(self._prepare_response_obj(args, kwargs))
+            if data is not None:
+                return self._app.response_class(data + b"\n", mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
@@ -0,0 +1,161 @@
+"""
+Request and SQL instrumentation exposed as Prometheus metrics.
+
+Every request records its latency, the number of SQL statements it ran,
+the time spent in the database and the response size, labelled by Flask
+endpoint. GET /metrics returns them in the Prometheus text format.
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty writable directory
+before the workers start; every worker then writes its samples there and
+/metrics aggregates all of them (gunicorn.conf.py clears the directory on
+startup and removes dead workers' gauges).
+
+Config:
+    METRICS_ENABLED          record metrics and serve /metrics (default True)
+    METRICS_SERVER_TIMING    add a Server-Timing header (default False)
+    METRICS_SLOW_REQUEST_MS  log requests slower than this with their SQL
+                             (default 500, 0 disables)
+"""
+
+import os
+import time
+
+from flask import Response, g, has_request_context, request
+from models import db
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_LATENCY = Histogram(
+    "starwars_request_duration_seconds",
+    "Time spent handling a request",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "starwars_request_queries",
+    "SQL statements executed per request",
+    ["endpoint"],
+    buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "starwars_request_db_seconds",
+    "Time spent executing SQL per request",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "starwars_response_size_bytes",
+    "Response body size (streamed responses are not counted)",
+    ["endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+class RequestStats:
+    """SQL statements and DB time collected for the current request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = []
+        self.db_time = 0.0
+
+    def add(self, statement, elapsed):
+        self.statements.append((statement, elapsed))
+        self.db_time += elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = g.get("request_stats") if has_request_context() else None
+    if stats is not None:
+        stats.add(statement, elapsed)
+
+
+def instrument_engine(engine):
+    """Count an engine's statements and DB time in the request metrics"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render_metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_SERVER_TIMING", False)
+    app.config.setdefault("METRICS_SLOW_REQUEST_MS", 500)
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    app.add_url_rule("/metrics", "metrics", render_metrics)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.pop("request_stats", None)
+        if stats is None or request.endpoint in ("metrics", "static"):
+            return response
+        elapsed = time.perf_counter() - stats.start
+        endpoint = request.endpoint or "unmatched"
+
+        REQUEST_LATENCY.labels(
+            request.method, endpoint, str(response.status_code)
+        ).observe(elapsed)
+        REQUEST_QUERIES.labels(endpoint).observe(len(stats.statements))
+        REQUEST_DB_TIME.labels(endpoint).observe(stats.db_time)
+        size = None if response.is_streamed else response.calculate_content_length()
+        if size is not None:
+            RESPONSE_SIZE.labels(endpoint).observe(size)
+
+        if app.config["METRICS_SERVER_TIMING"]:
+            response.headers["Server-Timing"] = (
+                f"db;dur={stats.db_time * 1000:.2f};"
+                f'desc="{len(stats.statements)} queries", '
+                f"app;dur={elapsed * 1000:.2f}"
+            )
+
+        slow_ms = app.config["METRICS_SLOW_REQUEST_MS"]
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            queries = "".join(
+                f"\n  {seconds * 1000:8.2f}ms  {statement}"
+                for statement, seconds in stats.statements
+            )
+            app.logger.warning(
+                "Slow request %s %s -> %s in %.0fms, %d queries (%.0fms in DB)%s",
+                request.method,
+                request.full_path.rstrip("?"),
+                response.status_code,
+                elapsed * 1000,
+                len(stats.statements),
+                stats.db_time * 1000,
+                queries,
+            )
+        return response
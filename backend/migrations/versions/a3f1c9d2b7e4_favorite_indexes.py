@@ -0,0 +1,47 @@
+"""Favorite indexes and per-entity uniqueness
+
+Revision ID: a3f1c9d2b7e4
+Revises: 065752244227
+Create Date: 2026-10-18 10:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d2b7e4'
+down_revision = '065752244227'
+branch_labels = None
+depends_on = None
+
+ENTITY_COLUMNS = ('people_id', 'planet_id', 'vehicle_id')
+
+
+def upgrade():
+    # Drop duplicates left behind by the old read-then-insert race,
+    # keeping the oldest row, so the unique indexes can be built
+    for column in ENTITY_COLUMNS:
+        op.execute(
+            f'DELETE FROM favorite WHERE {column} IS NOT NULL AND id NOT IN ('
+            f'SELECT MIN(id) FROM favorite WHERE {column} IS NOT NULL '
+            f'GROUP BY user_id, {column})'
+        )
+
+    op.create_index('ix_favorite_user_id', 'favorite', ['user_id'], unique=False)
+    for column in ENTITY_COLUMNS:
+        condition = sa.text(f'{column} IS NOT NULL')
+        op.create_index(
+            f'uq_favorite_user_{column}',
+            'favorite',
+            ['user_id', column],
+            unique=True,
+            sqlite_where=condition,
+            postgresql_where=condition,
+        )
+
+
+def downgrade():
+    for column in reversed(ENTITY_COLUMNS):
+        op.drop_index(f'uq_favorite_user_{column}', table_name='favorite')
+    op.drop_index('ix_favorite_user_id', table_name='favorite')
@@ -0,0 +1,88 @@
+"""Catalog full-text search index
+
+Revision ID: b7d2e8f4c1a9
+Revises: a3f1c9d2b7e4
+Create Date: 2026-10-18 11:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e8f4c1a9'
+down_revision = 'a3f1c9d2b7e4'
+branch_labels = None
+depends_on = None
+
+# table -> (type code packed into the FTS rowid, indexed text columns)
+SEARCH_TABLES = {
+    'people': (1, ('name',)),
+    'planet': (2, ('name', 'climate')),
+    'vehicle': (3, ('name', 'model', 'manufacturer')),
+}
+
+
+def details_sql(columns, prefix):
+    rest = [f"coalesce({prefix}{column}, '')" for column in columns[1:]]
+    return " || ' ' || ".join(rest) if rest else "''"
+
+
+def postgres_vector(columns):
+    parts = ["setweight(to_tsvector('simple', coalesce(name, '')), 'A')"]
+    parts += [
+        f"setweight(to_tsvector('simple', coalesce({column}, '')), 'B')"
+        for column in columns[1:]
+    ]
+    return ' || '.join(parts)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table, (_, columns) in SEARCH_TABLES.items():
+            op.execute(
+                f'CREATE INDEX ix_{table}_search ON {table} '
+                f'USING gin (({postgres_vector(columns)}))'
+            )
+        return
+    if dialect != 'sqlite':
+        return
+
+    op.execute(
+        'CREATE VIRTUAL TABLE catalog_search USING fts5('
+        "name, details, tokenize='unicode61 remove_diacritics 2')"
+    )
+    for table, (code, columns) in SEARCH_TABLES.items():
+        insert = (
+            'INSERT INTO catalog_search(rowid, name, details) VALUES '
+            f"(new.id * 4 + {code}, new.name, {details_sql(columns, 'new.')});"
+        )
+        delete = f'DELETE FROM catalog_search WHERE rowid = old.id * 4 + {code};'
+        op.execute(
+            f'CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} '
+            f'BEGIN {insert} END'
+        )
+        op.execute(
+            f'CREATE TRIGGER {table}_search_au AFTER UPDATE ON {table} '
+            f'BEGIN {delete} {insert} END'
+        )
+        op.execute(
+            f'CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} '
+            f'BEGIN {delete} END'
+        )
+        op.execute(
+            'INSERT INTO catalog_search(rowid, name, details) '
+            f"SELECT id * 4 + {code}, name, {details_sql(columns, '')} FROM {table}"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table in SEARCH_TABLES:
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search')
+    elif dialect == 'sqlite':
+        for table in SEARCH_TABLES:
+            for suffix in ('ai', 'au', 'ad'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_search_{suffix}')
+        op.execute('DROP TABLE IF EXISTS catalog_search')
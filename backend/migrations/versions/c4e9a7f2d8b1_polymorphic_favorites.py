@@ -0,0 +1,174 @@
+"""Polymorphic favorites: (user_id, entity_type, entity_id)
+
+Revision ID: c4e9a7f2d8b1
+Revises: b7d2e8f4c1a9
+Create Date: 2026-10-18 12:10:00.000000
+
+The favorite table is rebuilt as favorite_new and swapped in, so the
+migration can run while the app keeps serving. Existing rows are copied in
+id order, one batch per transaction, so no lock is held for more than one
+batch and memory stays flat. Only the last step runs as a single
+transaction, with favorite writes blocked: it drops the copied rows that
+were deleted or edited (e.g. in the admin) meanwhile, copies the rows
+added or edited meanwhile and renames the tables. Finding the edited rows
+compares both tables in full, so writers wait for one scan of each.
+
+    flask db upgrade -x favorite_batch_size=20000
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a7f2d8b1'
+down_revision = 'b7d2e8f4c1a9'
+branch_labels = None
+depends_on = None
+
+# entity_type code -> foreign key column of the old layout
+ENTITY_COLUMNS = {1: 'people_id', 2: 'planet_id', 3: 'vehicle_id'}
+BATCH_SIZE = 10000
+
+
+def batch_size():
+    x_args = context.get_x_argument(as_dictionary=True)
+    return int(x_args.get('favorite_batch_size', BATCH_SIZE))
+
+
+def copy_batches(columns, select):
+    """INSERT INTO favorite_new ... SELECT in committed id-range batches.
+
+    Returns the highest id copied, or None in offline (--sql) mode, where
+    everything is copied in one statement.
+    """
+    insert = f'INSERT INTO favorite_new ({columns}) {select}'
+    if context.is_offline_mode():
+        op.execute(insert)
+        return None
+    size = batch_size()
+    last_id = 0
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while True:
+            upper = connection.scalar(
+                sa.text(
+                    'SELECT max(id) FROM (SELECT id FROM favorite WHERE id > :after '
+                    'ORDER BY id LIMIT :size) AS batch'
+                ),
+                {'after': last_id, 'size': size},
+            )
+            if upper is None:
+                return last_id
+            connection.execute(
+                sa.text(f'{insert} AND id > :after AND id <= :upper'),
+                {'after': last_id, 'upper': upper},
+            )
+            last_id = upper
+
+
+def swap(columns, select, last_id):
+    """Catch up with concurrent writes and put favorite_new in place"""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Readers carry on, writers wait for the few statements below
+        op.execute('LOCK TABLE favorite IN EXCLUSIVE MODE')
+    if last_id is not None:
+        # Copied rows that no longer match their source (EXCEPT compares
+        # whole rows, NULLs included), then every source row not yet copied
+        op.execute(
+            sa.text(
+                'DELETE FROM favorite_new WHERE id IN (SELECT id FROM ('
+                f'SELECT {columns} FROM favorite_new WHERE id <= :after '
+                f'EXCEPT {select} AND id <= :after) AS stale)'
+            ).bindparams(after=last_id)
+        )
+        op.execute(
+            f'INSERT INTO favorite_new ({columns}) {select} AND NOT EXISTS '
+            '(SELECT 1 FROM favorite_new WHERE favorite_new.id = favorite.id)'
+        )
+    op.drop_table('favorite')
+    op.rename_table('favorite_new', 'favorite')
+    if dialect == 'postgresql':
+        op.execute(
+            'ALTER TABLE favorite RENAME CONSTRAINT favorite_new_pkey TO favorite_pkey'
+        )
+        op.execute(
+            'ALTER TABLE favorite '
+            'RENAME CONSTRAINT favorite_new_user_id_fkey TO favorite_user_id_fkey'
+        )
+        op.execute('ALTER SEQUENCE favorite_new_id_seq RENAME TO favorite_id_seq')
+        op.execute(
+            "SELECT setval('favorite_id_seq', coalesce(max(id), 1)) FROM favorite"
+        )
+
+
+def upgrade():
+    op.create_table('favorite_new',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.SmallInteger(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'uq_favorite_user_entity',
+        'favorite_new',
+        ['user_id', 'entity_type', 'entity_id'],
+        unique=True,
+        postgresql_include=['id'],
+    )
+    op.create_index(
+        'ix_favorite_entity', 'favorite_new', ['entity_type', 'entity_id']
+    )
+
+    entity_type = ' '.join(
+        f'WHEN {column} IS NOT NULL THEN {code}'
+        for code, column in ENTITY_COLUMNS.items()
+    )
+    entity_id = ', '.join(ENTITY_COLUMNS.values())
+    columns = 'id, user_id, entity_type, entity_id'
+    select = (
+        f'SELECT id, user_id, CASE {entity_type} END, coalesce({entity_id}) '
+        f'FROM favorite WHERE coalesce({entity_id}) IS NOT NULL'
+    )
+    last_id = copy_batches(columns, select)
+    swap(columns, select, last_id)
+
+
+def downgrade():
+    op.create_table('favorite_new',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('people_id', sa.Integer(), nullable=True),
+    sa.Column('planet_id', sa.Integer(), nullable=True),
+    sa.Column('vehicle_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['people_id'], ['people.id'], ),
+    sa.ForeignKeyConstraint(['planet_id'], ['planet.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicle.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_favorite_user_id', 'favorite_new', ['user_id'], unique=False)
+    for column in ENTITY_COLUMNS.values():
+        condition = sa.text(f'{column} IS NOT NULL')
+        op.create_index(
+            f'uq_favorite_user_{column}',
+            'favorite_new',
+            ['user_id', column],
+            unique=True,
+            sqlite_where=condition,
+            postgresql_where=condition,
+        )
+
+    entity_columns = ', '.join(
+        f'CASE WHEN entity_type = {code} THEN entity_id END'
+        for code in ENTITY_COLUMNS
+    )
+    columns = 'id, user_id, ' + ', '.join(ENTITY_COLUMNS.values())
+    select = (
+        f'SELECT id, user_id, {entity_columns} FROM favorite '
+        f'WHERE entity_type IN ({", ".join(map(str, ENTITY_COLUMNS))})'
+    )
+    last_id = copy_batches(columns, select)
+    swap(columns, select, last_id)
@@ -0,0 +1,41 @@
+"""Favorite counters per entity
+
+Revision ID: d8f3b6a1c5e2
+Revises: c4e9a7f2d8b1
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3b6a1c5e2'
+down_revision = 'c4e9a7f2d8b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('favorite_count',
+    sa.Column('entity_type', sa.SmallInteger(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+    )
+    op.create_index(
+        'ix_favorite_count_top',
+        'favorite_count',
+        ['entity_type', 'count', 'entity_id'],
+        unique=False,
+    )
+    op.execute(
+        'INSERT INTO favorite_count (entity_type, entity_id, count) '
+        'SELECT entity_type, entity_id, count(*) FROM favorite '
+        'GROUP BY entity_type, entity_id'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_favorite_count_top', table_name='favorite_count')
+    op.drop_table('favorite_count')
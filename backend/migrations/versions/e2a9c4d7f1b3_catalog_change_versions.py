@@ -0,0 +1,59 @@
+"""Catalog change versions and tombstones for /api/changes
+
+Revision ID: e2a9c4d7f1b3
+Revises: d8f3b6a1c5e2
+Create Date: 2026-10-18 15:05:00.000000
+
+Existing rows keep the baseline version 0, so adding the columns does not
+rewrite the tables on Postgres 11+ (constant defaults are metadata only).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9c4d7f1b3'
+down_revision = 'd8f3b6a1c5e2'
+branch_labels = None
+depends_on = None
+
+CATALOG_TABLES = ('people', 'planet', 'vehicle')
+
+
+def upgrade():
+    for table in CATALOG_TABLES:
+        op.add_column(
+            table,
+            sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        )
+        op.create_index(f'ix_{table}_version', table, ['version', 'id'], unique=False)
+
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(catalog_version, [{'id': 1, 'value': 0}])
+    op.create_table('catalog_tombstone',
+    sa.Column('entity_type', sa.SmallInteger(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+    )
+    op.create_index(
+        'ix_catalog_tombstone_version',
+        'catalog_tombstone',
+        ['version', 'entity_type', 'entity_id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_catalog_tombstone_version', table_name='catalog_tombstone')
+    op.drop_table('catalog_tombstone')
+    op.drop_table('catalog_version')
+    # Plain ALTER TABLE (SQLite 3.35+): a batch table rebuild would drop the
+    # search triggers on these tables
+    for table in CATALOG_TABLES:
+        op.drop_index(f'ix_{table}_version', table_name=table)
+        op.drop_column(table, 'version')
@@ -1,8 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Boolean, String
-from sqlalchemy.orm import Mapped, mapped_column
+from replicas import RoutingSession
+from sqlalchemy import BigInteger, Boolean, SmallInteger, String, event
+from sqlalchemy.orm import (
+    Mapped,
+    declared_attr,
+    foreign,
+    joinedload,
+    mapped_column,
+)
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class User(db.Model):
@@ -28,7 +35,30 @@ class User(db.Model):
         }
 
 
-class People(db.Model):
+class ChangeTracked:
+    """Catalog rows stamped with the catalog version of their last change.
+
+    The version is set by the session hooks in changes.py; rows bulk-loaded
+    without one keep the baseline version 0.
+    """
+
+    version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0", info={"internal": True}
+    )
+
+    @declared_attr.directive
+    def __table_args__(cls):
+        return (db.Index(f"ix_{cls.__tablename__}_version", "version", "id"),)
+
+
+def api_columns(model):
+    """Columns the API reads and writes, without internal bookkeeping ones"""
+    return [
+        column for column in model.__table__.columns if not column.info.get("internal")
+    ]
+
+
+class People(ChangeTracked, db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
     gender: Mapped[str] = mapped_column(String(20))
@@ -45,7 +75,7 @@ class People(db.Model):
         }
 
 
-class Planet(db.Model):
+class Planet(ChangeTracked, db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
     climate: Mapped[str] = mapped_column(String(120))
@@ -62,7 +92,7 @@ class Planet(db.Model):
         }
 
 
-class Vehicle(db.Model):
+class Vehicle(ChangeTracked, db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
     model: Mapped[str] = mapped_column(String(120))
@@ -79,18 +109,103 @@ class Vehicle(db.Model):
         }
 
 
+class CatalogVersion(db.Model):
+    """Single-row counter handing out catalog change versions"""
+
+    __tablename__ = "catalog_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class CatalogTombstone(db.Model):
+    """Catalog rows deleted at a version, for /api/changes"""
+
+    __tablename__ = "catalog_tombstone"
+    __table_args__ = (
+        db.Index("ix_catalog_tombstone_version", "version", "entity_type", "entity_id"),
+    )
+
+    entity_type: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    entity_id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+# Favorite.entity_type codes. A new favoritable model needs an entry here and
+# a relationship on Favorite, not a new column.
+FAVORITE_TYPES = {"people": 1, "planet": 2, "vehicle": 3}
+
+
+def _favorite_entity(model, entity_type):
+    """Read-only many-to-one from a favorite to the entity it points at"""
+    code = FAVORITE_TYPES[entity_type]
+    return db.relationship(
+        model,
+        primaryjoin=lambda: db.and_(
+            Favorite.entity_type == code, foreign(Favorite.entity_id) == model.id
+        ),
+        viewonly=True,
+    )
+
+
 class Favorite(db.Model):
+    __table_args__ = (
+        # Covers the per-user list, the duplicate check on add and removals
+        db.Index(
+            "uq_favorite_user_entity",
+            "user_id",
+            "entity_type",
+            "entity_id",
+            unique=True,
+            postgresql_include=["id"],
+        ),
+        # Finds the favorites of an entity when it is deleted
+        db.Index("ix_favorite_entity", "entity_type", "entity_id"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
         db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False
     )
-    people_id: Mapped[int] = mapped_column(db.ForeignKey("people.id"), nullable=True)
-    planet_id: Mapped[int] = mapped_column(db.ForeignKey("planet.id"), nullable=True)
-    vehicle_id: Mapped[int] = mapped_column(db.ForeignKey("vehicle.id"), nullable=True)
-
-    people = db.relationship("People")
-    planet = db.relationship("Planet")
-    vehicle = db.relationship("Vehicle")
+    # active_history: popularity.py needs the old entity of a moved favorite
+    entity_type: Mapped[int] = mapped_column(
+        SmallInteger, nullable=False, active_history=True
+    )
+    entity_id: Mapped[int] = mapped_column(nullable=False, active_history=True)
+
+    people = _favorite_entity(People, "people")
+    planet = _favorite_entity(Planet, "planet")
+    vehicle = _favorite_entity(Vehicle, "vehicle")
+
+    @classmethod
+    def for_entity(cls, user_id, entity_type, entity):
+        """New favorite with its entity attached, so serialize() needs no loads"""
+        fav = cls(
+            user_id=user_id,
+            entity_type=FAVORITE_TYPES[entity_type],
+            entity_id=entity.id,
+        )
+        for name in FAVORITE_TYPES:
+            setattr(fav, name, entity if name == entity_type else None)
+        return fav
+
+    @classmethod
+    def query_for_user(cls, user_id):
+        """Favorites of a user with their entities joined in a single SELECT"""
+        return cls.query.filter_by(user_id=user_id).options(*cls._entity_loads())
+
+    @classmethod
+    def select_for_user(cls, user_id):
+        """2.0-style SELECT of query_for_user(), for async sessions"""
+        return db.select(cls).filter_by(user_id=user_id).options(*cls._entity_loads())
+
+    @classmethod
+    def _entity_loads(cls):
+        return (
+            joinedload(cls.people),
+            joinedload(cls.planet),
+            joinedload(cls.vehicle),
+        )
 
     def serialize(self):
         return {
@@ -100,3 +215,36 @@ class Favorite(db.Model):
             "planet": self.planet.serialize() if self.planet else None,
             "vehicle": self.vehicle.serialize() if self.vehicle else None,
         }
+
+
+class FavoriteCount(db.Model):
+    """Number of favorites per entity, maintained by popularity.py"""
+
+    __tablename__ = "favorite_count"
+    __table_args__ = (
+        # Top-N per type is a backward range scan of LIMIT entries
+        db.Index("ix_favorite_count_top", "entity_type", "count", "entity_id"),
+    )
+
+    entity_type: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    entity_id: Mapped[int] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+def _cascade_favorites(model, entity_type):
+    """Delete an entity's favorites with it, as entity_id has no foreign key"""
+    code = FAVORITE_TYPES[entity_type]
+
+    @event.listens_for(model, "after_delete")
+    def delete_favorites(mapper, connection, target):
+        for table in (Favorite, FavoriteCount):
+            connection.execute(
+                db.delete(table).where(
+                    table.entity_type == code, table.entity_id == target.id
+                )
+            )
+
+
+_cascade_favorites(People, "people")
+_cascade_favorites(Planet, "planet")
+_cascade_favorites(Vehicle, "vehicle")
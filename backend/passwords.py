@@ -0,0 +1,80 @@
+"""
+Password hashing with bounded concurrency.
+
+scrypt/pbkdf2 hashing is deliberately slow. Left unbounded, a burst of
+logins occupies every request thread and starves the catalog endpoints, so
+at most PASSWORD_HASH_WORKERS requests of a process hash at once; across a
+deployment that is PASSWORD_HASH_WORKERS times the number of gunicorn
+workers. The cap only matters with more request threads than that per
+worker (gunicorn.conf.py runs gthread workers). Requests that cannot get a
+slot within PASSWORD_HASH_QUEUE_TIMEOUT seconds fail fast with a 503.
+hashlib releases the GIL while hashing, so the other threads keep serving.
+"""
+
+import threading
+
+from utils import APIException
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+
+def normalize_method(method):
+    """The method prefix Werkzeug stores for a configured method.
+
+    "scrypt" is stored as "scrypt:32768:8:1" and "pbkdf2" or
+    "pbkdf2:sha256" as "pbkdf2:sha256:<default iterations>".
+    """
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return DEFAULT_HASH_METHOD
+    if name == "pbkdf2" and len(args) < 2:
+        hash_name = args[0] if args else "sha256"
+        return f"pbkdf2:{hash_name}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = DEFAULT_HASH_METHOD
+        self.queue_timeout = 5.0
+        self._slots = None
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", DEFAULT_HASH_METHOD)
+        # Concurrent hashes per process; 0 disables the cap
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 2)
+        app.config.setdefault("PASSWORD_HASH_QUEUE_TIMEOUT", 5.0)
+        self.method = normalize_method(app.config["PASSWORD_HASH_METHOD"])
+        self.queue_timeout = app.config["PASSWORD_HASH_QUEUE_TIMEOUT"]
+
+        workers = app.config["PASSWORD_HASH_WORKERS"]
+        self._slots = threading.BoundedSemaphore(workers) if workers > 0 else None
+        app.extensions["password_hasher"] = self
+
+    def _run(self, fn, *args):
+        if self._slots is None:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise APIException("Server busy, please retry", status_code=503)
+        try:
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when a stored hash was made with a different method or cost"""
+        return pwhash.split("$", 1)[0] != self.method
+
+
+passwords = PasswordHasher()
@@ -0,0 +1,113 @@
+"""
+Favorite counts per catalog entity and the "most favorited" lists.
+
+favorite_count holds one row per favorited entity and is updated in the
+same transaction as the favorites themselves: favorites added, deleted or
+pointed at another entity through the session (single and batch adds,
+admin edits, the cascade when a user is deleted) are counted by an
+after_flush hook, and the bulk DELETEs
+of the remove routes call adjust_counts() directly. Reading the top N of a
+type is a LIMIT N range scan of ix_favorite_count_top, however many
+favorites there are. `flask catalog rebuild-counts` recomputes the table
+from scratch.
+"""
+
+from collections import Counter
+
+from models import FAVORITE_TYPES, Favorite, FavoriteCount, db
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def increment_statement(dialect):
+    """INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count"""
+    table = FavoriteCount.__table__
+    if dialect == "mysql":
+        statement = mysql.insert(table)
+        return statement.on_duplicate_key_update(
+            count=table.c.count + statement.inserted["count"]
+        )
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    if dialect not in dialects:
+        raise RuntimeError(f"Favorite counts are not supported on {dialect}")
+    statement = dialects[dialect].insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=["entity_type", "entity_id"],
+        set_={"count": table.c.count + statement.excluded["count"]},
+    )
+
+
+def adjust_counts(connection, deltas):
+    """Add {(entity_type code, entity_id): delta} to favorite_count"""
+    # Sorted so concurrent transactions lock counter rows in the same order
+    rows = [
+        {"entity_type": entity_type, "entity_id": entity_id, "count": delta}
+        for (entity_type, entity_id), delta in sorted(deltas.items())
+        if delta
+    ]
+    if rows:
+        connection.execute(increment_statement(connection.dialect.name), rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed_favorites(session, flush_context):
+    deltas = Counter()
+    for fav in session.new:
+        if isinstance(fav, Favorite):
+            deltas[(fav.entity_type, fav.entity_id)] += 1
+    for fav in session.deleted:
+        if isinstance(fav, Favorite):
+            deltas[(fav.entity_type, fav.entity_id)] -= 1
+    for fav in session.dirty:
+        if isinstance(fav, Favorite):
+            # An edit that moves the favorite to another entity
+            attrs = inspect(fav).attrs
+            history = [attrs.entity_type.history, attrs.entity_id.history]
+            if any(change.deleted for change in history):
+                old = tuple(
+                    change.deleted[0] if change.deleted else change.unchanged[0]
+                    for change in history
+                )
+                deltas[old] -= 1
+                deltas[(fav.entity_type, fav.entity_id)] += 1
+    if deltas:
+        # The connection, not the session, as this runs inside the flush
+        adjust_counts(session.connection(), deltas)
+
+
+def most_favorited(types, limit):
+    """(type, id, count) of the most favorited entities, highest first"""
+    top = []
+    for entity_type in types:
+        query = (
+            db.select(FavoriteCount.entity_id, FavoriteCount.count)
+            .where(
+                FavoriteCount.entity_type == FAVORITE_TYPES[entity_type],
+                FavoriteCount.count > 0,
+            )
+            .order_by(FavoriteCount.count.desc(), FavoriteCount.entity_id.desc())
+            .limit(limit)
+        )
+        top += [(entity_type, *row) for row in db.session.execute(query)]
+    # At most limit rows per type, so merging the types is a small sort
+    top.sort(key=lambda row: (row[2], row[1]), reverse=True)
+    return top[:limit]
+
+
+def rebuild_counts():
+    """Recompute favorite_count from the favorite table; returns the row count"""
+    if db.session.get_bind().dialect.name == "postgresql":
+        # Hold off favorite writes so no change lands between the two steps
+        db.session.execute(db.text("LOCK TABLE favorite IN SHARE MODE"))
+    db.session.execute(db.delete(FavoriteCount))
+    counts = db.select(
+        Favorite.entity_type, Favorite.entity_id, db.func.count()
+    ).group_by(Favorite.entity_type, Favorite.entity_id)
+    result = db.session.execute(
+        db.insert(FavoriteCount).from_select(
+            ["entity_type", "entity_id", "count"], counts
+        )
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,132 @@
+"""
+Opt-in routing of read-only requests to read replicas.
+
+Replicas are extra SQLAlchemy binds named replica_0, replica_1, ... built
+from READ_REPLICA_URLS. Views decorated with @use_replica send their
+queries to a replica chosen by READ_REPLICA_STRATEGY ("round_robin" or
+"random"). Once the request flushes a write, every later statement in that
+request goes to the primary, so it reads its own writes. A replica that
+fails to connect or drops the connection is skipped for
+READ_REPLICA_RETRY_AFTER seconds and the view is retried on the primary;
+other database errors are raised as they are. Streamed views must run
+their query before returning the response, so that it is retried too.
+"""
+
+import itertools
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+REPLICA_PREFIX = "replica_"
+
+
+class ReplicaPool:
+    def __init__(self):
+        self._down_until = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, engines):
+        config = current_app.config
+        now = time.monotonic()
+        with self._lock:
+            names = sorted(
+                name
+                for name in engines
+                if name
+                and name.startswith(REPLICA_PREFIX)
+                and self._down_until.get(name, 0) <= now
+            )
+        if not names:
+            return None
+        if config.get("READ_REPLICA_STRATEGY") == "random":
+            name = random.choice(names)
+        else:
+            name = names[next(self._counter) % len(names)]
+        return name
+
+    def mark_down(self, name):
+        retry_after = current_app.config.get("READ_REPLICA_RETRY_AFTER", 30)
+        with self._lock:
+            self._down_until[name] = time.monotonic() + retry_after
+
+
+replica_pool = ReplicaPool()
+
+
+class RoutingSession(Session):
+    """Session that sends reads of @use_replica requests to a replica bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and self.info.get("use_replica")
+            and not self.info.get("wrote")
+            and not self._flushing
+        ):
+            name = self.info.get("replica") or replica_pool.choose(self._db.engines)
+            if name is not None:
+                self.info["replica"] = name
+                return self._db.engines[name]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    session.info["wrote"] = True
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS entries for a list of replica URIs"""
+    return {f"{REPLICA_PREFIX}{i}": url for i, url in enumerate(urls)}
+
+
+def use_replica(view):
+    """Run a read-only view against a read replica when one is configured"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        session = current_app.extensions["sqlalchemy"].session()
+        session.info["use_replica"] = True
+        try:
+            return view(*args, **kwargs)
+        except OperationalError as error:
+            replica = session.info.pop("replica", None)
+            if replica is None or not error.connection_invalidated:
+                raise
+            # The replica is unreachable: skip it for a while, retry on primary
+            replica_pool.mark_down(replica)
+            session.rollback()
+            session.info["use_replica"] = False
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _connect_failure_is_disconnect(context):
+    # Dialects only flag lost connections (SQLite not even those); a replica
+    # that cannot be reached at all counts as disconnected too
+    if context.connection is None:
+        context.is_disconnect = True
+
+
+def init_app(app):
+    app.config.setdefault("READ_REPLICA_STRATEGY", "round_robin")
+    app.config.setdefault("READ_REPLICA_RETRY_AFTER", 30)
+
+    with app.app_context():
+        for name, engine in app.extensions["sqlalchemy"].engines.items():
+            if name and name.startswith(REPLICA_PREFIX):
+                event.listen(engine, "handle_error", _connect_failure_is_disconnect)
+
+    @app.teardown_request
+    def reset_replica_routing(exc):
+        session = app.extensions["sqlalchemy"].session()
+        for key in ("use_replica", "replica", "wrote"):
+            session.info.pop(key, None)
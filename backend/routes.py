@@ -1,10 +1,59 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
-from models import Favorite, People, Planet, User, Vehicle, db
-from werkzeug.security import check_password_hash, generate_password_hash
+from collections import Counter
+
+from cache import cached_body, cached_response
+from changes import CHANGE_NAMES, catalog_changes, current_version, since_cursor
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
+from flask_jwt_extended import (
+    create_access_token,
+    current_user,
+    jwt_required,
+    verify_jwt_in_request,
+)
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+from models import (
+    FAVORITE_TYPES,
+    Favorite,
+    People,
+    Planet,
+    User,
+    Vehicle,
+    api_columns,
+    db,
+)
+from passwords import passwords
+from popularity import adjust_counts, most_favorited
+from replicas import use_replica
+from search import SEARCH_TYPES, search_catalog
+from snapshot import catalog_snapshot
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from utils import APIException, decode_cursor, encode_cursor, stream_format
 
 api = Blueprint("api", __name__)
 
+# Keyset pagination limits for the entity list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Rows fetched per round trip when streaming a full export
+STREAM_BATCH_SIZE = 1000
+
+# Collection name in the URL -> catalog model
+CATALOG_MODELS = {"people": People, "planets": Planet, "vehicles": Vehicle}
+
+# Favorite type in the URL -> entity model
+FAVORITE_MODELS = {"planet": Planet, "people": People, "vehicle": Vehicle}
+MAX_BATCH_SIZE = 500
+
 
 @api.route("/api/auth/signup", methods=["POST"])
 def signup():
@@ -17,7 +66,7 @@ def signup():
         return jsonify({"message": "User already exists"}), 409
     from datetime import datetime
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = passwords.hash(password)
     user = User(
         email=email,
         password=hashed_password,
@@ -41,8 +90,7 @@ def signup():
 
 def get_authenticated_user():
     """Get the currently authenticated user from JWT"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user
     if not user:
         return None, jsonify({"msg": "User not found"}), 404
     return user, None, 200
@@ -54,45 +102,181 @@ def handle_favorite_action(entity_type, entity_id, action):
     if error_response:
         return error_response, status_code
 
-    # Get the entity model and field name
-    models = {
-        "planet": (Planet, "planet_id"),
-        "people": (People, "people_id"),
-        "vehicle": (Vehicle, "vehicle_id"),
-    }
-    model_class, field_name = models[entity_type]
-
-    entity = model_class.query.get_or_404(entity_id)
-    filter_kwargs = {"user_id": user.id, field_name: entity.id}
-    existing = Favorite.query.filter_by(**filter_kwargs).first()
-
-    if action == "add":
-        if existing:
-            return jsonify({"msg": f"{entity_type.title()} already in favorites"}), 400
-        fav = Favorite(user_id=user.id, **{field_name: entity.id})
-        db.session.add(fav)
-        db.session.commit()
-        return jsonify(fav.serialize()), 201
-
-    elif action == "remove":
-        if not existing:
-            return jsonify({"msg": f"{entity_type.title()} not in favorites"}), 404
-        db.session.delete(existing)
-        db.session.commit()
-        return jsonify({"msg": f"{entity_type.title()} removed from favorites"}), 200
+    return handle_favorite_action_jwt(entity_type, entity_id, action)
 
 
 def handle_entity_request(entity_type, entity_id=None):
-    """Generic handler for entity GET requests"""
-    models = {"people": People, "planets": Planet, "vehicles": Vehicle}
-    model_class = models[entity_type]
+    """Generic handler for entity GET requests.
+
+    Catalog rows are read with Core SELECTs straight into dicts, skipping
+    ORM instances; each row has the same keys and values as serialize().
+    """
+    model_class = CATALOG_MODELS[entity_type]
+    fields = parse_fields(model_class)
+    ids = parse_ids()
+    query = catalog_select(model_class, fields)
 
     if entity_id:
-        entity = model_class.query.get_or_404(entity_id)
-        return jsonify(entity.serialize()), 200
+        row = db.session.execute(query.where(model_class.id == entity_id))
+        row = row.mappings().first()
+        if row is None:
+            abort(404)
+        return jsonify(dict(row)), 200
+    elif ids is not None:
+        rows = db.session.execute(ids_query(model_class, fields, ids)).mappings()
+        return jsonify([dict(row) for row in rows]), 200
+    elif stream_format(request):
+        return stream_entities(model_class, stream_format(request), fields)
+    elif "limit" in request.args or "after" in request.args:
+        return jsonify(paginate_entities(model_class, fields)), 200
     else:
-        entities = model_class.query.all()
-        return jsonify([e.serialize() for e in entities]), 200
+        rows = db.session.execute(query.order_by(model_class.id)).mappings()
+        return jsonify([dict(row) for row in rows]), 200
+
+
+def parse_fields(model_class):
+    """Columns requested with ?fields=a,b, validated against the model.
+
+    Returns None when the parameter is absent, meaning every column.
+    """
+    raw = request.args.get("fields")
+    if raw is None:
+        return None
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    allowed = [column.name for column in api_columns(model_class)]
+    unknown = [f for f in fields if f not in allowed]
+    if not fields or unknown:
+        raise APIException(
+            f"Unknown fields: {', '.join(unknown)}" if unknown else "fields is empty",
+            status_code=400,
+            payload={"allowed_fields": allowed},
+        )
+    return fields
+
+
+def parse_ids():
+    """Ids requested with ?ids=1,5,9, or None when the parameter is absent"""
+    raw = request.args.get("ids")
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(i) for i in raw.split(",") if i.strip()))
+    except ValueError:
+        raise APIException("ids must be comma-separated integers", status_code=400)
+    if not ids:
+        raise APIException("ids is empty", status_code=400)
+    if len(ids) > MAX_PAGE_SIZE:
+        raise APIException(f"At most {MAX_PAGE_SIZE} ids per request", status_code=400)
+    return ids
+
+
+def ids_query(model_class, fields, ids):
+    """One IN query for a batch of ids; unknown ids are left out"""
+    query = catalog_select(model_class, fields).where(model_class.id.in_(ids))
+    return query.order_by(model_class.id)
+
+
+def catalog_select(model_class, fields=None):
+    """Core SELECT of the serialized columns (all of them when fields is None)"""
+    if fields is None:
+        return db.select(*api_columns(model_class))
+    columns = model_class.__table__.columns
+    return db.select(*(columns[name] for name in fields))
+
+
+def stream_entities(model_class, fmt, fields=None):
+    """Stream every row as a JSON array or NDJSON without buffering the list.
+
+    Rows are read in STREAM_BATCH_SIZE batches over a server-side cursor
+    (yield_per) and each batch is written out as soon as it is serialized.
+    The query runs before the response is returned, so @use_replica can
+    still retry it on the primary.
+    """
+    batches = db.session.execute(stream_query(model_class, fields))
+    batches = batches.mappings().partitions()
+    json_provider = current_app.json
+
+    def generate():
+        first = True
+        for batch in batches:
+            yield stream_chunk(json_provider, batch, fmt, first)
+            first = False
+        yield stream_end(fmt, first)
+
+    return Response(stream_with_context(generate()), mimetype=stream_mimetype(fmt))
+
+
+def stream_query(model_class, fields=None):
+    return (
+        catalog_select(model_class, fields)
+        .order_by(model_class.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+
+def stream_chunk(json_provider, batch, fmt, first):
+    """One streamed batch, in the same compact encoding jsonify() uses"""
+    rows = [json_provider.dumps(dict(row), separators=(",", ":")) for row in batch]
+    if fmt == "ndjson":
+        return "".join(row + "\n" for row in rows)
+    return ("[" if first else ",") + ",".join(rows)
+
+
+def stream_end(fmt, empty):
+    if fmt == "ndjson":
+        return ""
+    return "[]\n" if empty else "]\n"
+
+
+def stream_mimetype(fmt):
+    return "application/x-ndjson" if fmt == "ndjson" else "application/json"
+
+
+def get_page_size():
+    """Read ?limit= from the query string, capped at MAX_PAGE_SIZE"""
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise APIException("limit must be an integer", status_code=400)
+    if limit < 1:
+        raise APIException("limit must be positive", status_code=400)
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_entities(model_class, fields=None):
+    """Keyset pagination ordered by primary key.
+
+    Seeks past the id stored in the ?after= cursor instead of using OFFSET,
+    so every page costs the same regardless of table size.
+    """
+    query, limit, keyed = page_query(model_class, fields)
+    rows = db.session.execute(query).mappings()
+    return page_body(rows, limit, fields, keyed)
+
+
+def page_query(model_class, fields=None):
+    """SELECT for the requested page, the page size and the selected fields"""
+    limit = get_page_size()
+    # The cursor needs the key even when ?fields= leaves it out
+    keyed = fields + ["id"] if fields and "id" not in fields else fields
+    query = catalog_select(model_class, keyed).order_by(model_class.id)
+    after = request.args.get("after")
+    if after:
+        query = query.where(model_class.id > decode_cursor(after))
+    # Fetch one extra row to know whether another page exists
+    return query.limit(limit + 1), limit, keyed
+
+
+def page_body(result, limit, fields, keyed):
+    rows = [dict(row) for row in result]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["id"]) if has_more else None
+    if keyed is not fields:
+        for row in rows:
+            del row["id"]
+    return {"results": rows, "next_cursor": next_cursor}
 
 
 # JWT Login Endpoint
@@ -104,10 +288,14 @@ def login():
     if not email or not password:
         return jsonify({"message": "Email and password are required"}), 400
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password, password):
+    if not user or not passwords.verify(user.password, password):
         return jsonify({"message": "Invalid credentials"}), 401
     if not user.is_active:
         return jsonify({"message": "Account is deactivated"}), 403
+    # Transparently move old hashes to the configured method and cost
+    if passwords.needs_rehash(user.password):
+        user.password = passwords.hash(password)
+        db.session.commit()
     access_token = create_access_token(identity=str(user.id))
     return jsonify({"access_token": access_token, "user": user.serialize()}), 200
 
@@ -116,59 +304,249 @@ def login():
 @api.route("/api/protected", methods=["GET"])
 @jwt_required()
 def protected():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
+    # Loaded (usually from cache) by the JWT user_lookup_loader; a missing
+    # user is already answered with 404 before the view runs
+    user = current_user
     return jsonify({"message": "Access granted", "user": user.serialize()}), 200
 
 
 # Star Wars entity endpoints (public)
 @api.route("/api/people", methods=["GET"])
+@catalog_snapshot.serves("people")
+@cached_response
+@use_replica
 def get_people():
-    people = People.query.all()
-    return jsonify([p.serialize() for p in people]), 200
+    return handle_entity_request("people")
 
 
 @api.route("/api/people/<int:people_id>", methods=["GET"])
+@cached_response
+@use_replica
 def get_person(people_id):
-    person = People.query.get_or_404(people_id)
-    return jsonify(person.serialize()), 200
+    return handle_entity_request("people", people_id)
 
 
 @api.route("/api/planets", methods=["GET"])
+@catalog_snapshot.serves("planets")
+@cached_response
+@use_replica
 def get_planets():
-    planets = Planet.query.all()
-    return jsonify([p.serialize() for p in planets]), 200
+    return handle_entity_request("planets")
 
 
 @api.route("/api/planets/<int:planet_id>", methods=["GET"])
+@cached_response
+@use_replica
 def get_planet(planet_id):
-    planet = Planet.query.get_or_404(planet_id)
-    return jsonify(planet.serialize()), 200
+    return handle_entity_request("planets", planet_id)
 
 
 @api.route("/api/vehicles", methods=["GET"])
+@catalog_snapshot.serves("vehicles")
+@cached_response
+@use_replica
 def get_vehicles():
-    vehicles = Vehicle.query.all()
-    return jsonify([v.serialize() for v in vehicles]), 200
+    return handle_entity_request("vehicles")
 
 
 @api.route("/api/vehicles/<int:vehicle_id>", methods=["GET"])
+@cached_response
+@use_replica
 def get_vehicle(vehicle_id):
-    vehicle = Vehicle.query.get_or_404(vehicle_id)
-    return jsonify(vehicle.serialize()), 200
+    return handle_entity_request("vehicles", vehicle_id)
+
+
+@api.route("/api/search", methods=["GET"])
+@cached_response
+@use_replica
+def search():
+    """Ranked, prefix-aware search across people, planets and vehicles"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        raise APIException("q is required", status_code=400)
+    entity_type = request.args.get("type")
+    if entity_type and entity_type not in SEARCH_TYPES:
+        raise APIException(f"Unknown type: {entity_type}", status_code=400)
+    limit = get_page_size()
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        raise APIException("offset must be an integer", status_code=400)
+
+    types = [entity_type] if entity_type else None
+    hits = search_catalog(query, types, limit + 1, offset)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    entities = load_entities(hits)
+    results = [
+        {
+            "type": hit_type,
+            "score": score,
+            "item": entities[(hit_type, hit_id)].serialize(),
+        }
+        for hit_type, hit_id, score in hits
+        if (hit_type, hit_id) in entities
+    ]
+    return (
+        jsonify(
+            {
+                "results": results,
+                "next_offset": offset + limit if has_more else None,
+            }
+        ),
+        200,
+    )
+
+
+@api.route("/api/catalog", methods=["GET"])
+@use_replica
+def get_catalog():
+    """People, planets and vehicles in one response, with favorites if signed in.
+
+    Every section has a version (a hash of its items). Sections passed as
+    ?versions=people:<version>,planets:<version> that have not changed come
+    back without items.
+    """
+    known = parse_versions()
+    if optional_identity() is None:
+        response = cached_response(lambda: catalog_response(known))()
+    else:
+        favorites = Favorite.query_for_user(current_user.id).order_by(Favorite.id)
+        response = catalog_response(known, [fav.serialize() for fav in favorites])
+        # The favorites are one user's; no shared cache may keep them
+        response.cache_control.private = True
+    response.vary.add("Authorization")
+    return response
+
+
+def optional_identity():
+    """verify_jwt_in_request(optional=True), treating a bad token as none.
+
+    An expired or malformed token, or one for a deleted user, still gets
+    the public catalog rather than an error.
+    """
+    try:
+        return verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None
+
+
+def parse_versions():
+    known = {}
+    for part in request.args.get("versions", "").split(","):
+        collection, _, version = part.strip().partition(":")
+        if collection in CATALOG_MODELS and version:
+            known[collection] = version
+    return known
+
+
+def catalog_response(known, favorites=None):
+    """Assemble the combined body from cached per-collection JSON"""
+    dumps = current_app.json.dumps
+    parts = []
+    if favorites is not None:
+        parts.append(b'"favorites":' + dumps(favorites, separators=(",", ":")).encode())
+    for collection, model_class in CATALOG_MODELS.items():
+        entry = cached_body(
+            ("catalog", collection), lambda m=model_class: collection_body(m)
+        )
+        section = b'"%s":{"version":"%s"' % (collection.encode(), entry.etag.encode())
+        if known.get(collection) != entry.etag:
+            section += b',"items":' + entry.body
+        parts.append(section + b"}")
+    return Response(b"{" + b",".join(parts) + b"}\n", mimetype="application/json")
+
+
+def collection_body(model_class):
+    query = catalog_select(model_class).order_by(model_class.id)
+    rows = [dict(row) for row in db.session.execute(query).mappings()]
+    return current_app.json.dumps(rows, separators=(",", ":")).encode()
+
+
+def load_entities(hits):
+    """Catalog rows for (type, id, ...) hits, one IN query per type"""
+    entities = {}
+    for hit_type in {hit[0] for hit in hits}:
+        model_class = FAVORITE_MODELS[hit_type]
+        ids = [hit[1] for hit in hits if hit[0] == hit_type]
+        for entity in model_class.query.filter(model_class.id.in_(ids)):
+            entities[(hit_type, entity.id)] = entity
+    return entities
+
+
+@api.route("/api/popular", methods=["GET"])
+@use_replica
+def popular():
+    """Most favorited people, planets or vehicles, from the favorite counters"""
+    entity_type = request.args.get("type")
+    if entity_type and entity_type not in FAVORITE_MODELS:
+        raise APIException(f"Unknown type: {entity_type}", status_code=400)
+    limit = get_page_size()
+    types = [entity_type] if entity_type else list(FAVORITE_MODELS)
+    top = most_favorited(types, limit)
+    entities = load_entities(top)
+    results = [
+        {
+            "type": top_type,
+            "favorites": count,
+            "item": entities[(top_type, top_id)].serialize(),
+        }
+        for top_type, top_id, count in top
+        if (top_type, top_id) in entities
+    ]
+    return jsonify({"results": results}), 200
+
+
+@api.route("/api/changes", methods=["GET"])
+@use_replica
+def get_changes():
+    """Catalog rows changed or deleted since catalog version ?since=.
+
+    Changes are ordered by (version, type, id) and paged with ?after=;
+    without ?since= the feed starts with every row. Once next_cursor is
+    null, the returned version is the ?since= for the next sync.
+    """
+    since = request.args.get("since")
+    after = request.args.get("after")
+    if after:
+        cursor = decode_cursor(after, size=3)
+    else:
+        try:
+            cursor = since_cursor(int(since) if since is not None else -1)
+        except ValueError:
+            raise APIException("since must be an integer", status_code=400)
+    limit = get_page_size()
+    # Read first: changes committed after this point wait for the next sync
+    version = current_version()
+    changes = [
+        change for change in catalog_changes(cursor, limit + 1) if change[0] <= version
+    ]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    results = []
+    for change_version, code, entity_id, row in changes:
+        change = {
+            "type": CHANGE_NAMES[code],
+            "id": entity_id,
+            "version": change_version,
+            "op": "delete" if row is None else "upsert",
+        }
+        if row is not None:
+            change["item"] = row
+        results.append(change)
+    next_cursor = encode_cursor(list(changes[-1][:3])) if has_more else None
+    return jsonify({"changes": results, "next_cursor": next_cursor, "version": version})
 
 
 # Favorites endpoints (JWT protected)
 @api.route("/api/users/favorites", methods=["GET"])
 @jwt_required()
+@use_replica
 def get_user_favorites():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-    return jsonify([fav.serialize() for fav in user.favorites]), 200
+    user = current_user
+    favorites = Favorite.query_for_user(user.id).order_by(Favorite.id).all()
+    return jsonify([fav.serialize() for fav in favorites]), 200
 
 
 @api.route("/api/favorite/planet/<int:planet_id>", methods=["POST"])
@@ -207,32 +585,142 @@ def remove_favorite_vehicle(vehicle_id):
     return handle_favorite_action_jwt("vehicle", vehicle_id, "remove")
 
 
+@api.route("/api/users/favorites/batch", methods=["POST", "DELETE"])
+@jwt_required()
+def batch_favorites():
+    """Add (POST) or remove (DELETE) many favorites in one transaction.
+
+    Body: {"items": [{"type": "planet", "id": 1}, ...]}. Every item gets its
+    own status in the response; the request as a whole only fails when the
+    body itself is malformed.
+    """
+    user = current_user
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "items must be a non-empty list"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return (
+            jsonify({"message": f"At most {MAX_BATCH_SIZE} items per request"}),
+            400,
+        )
+    action = "add" if request.method == "POST" else "remove"
+    return jsonify({"results": apply_favorite_batch(user, items, action)}), 200
+
+
+def apply_favorite_batch(user, items, action):
+    """Resolve a favorites batch with one IN query per type and a single commit"""
+    # Group requested ids by type, flagging malformed items up front
+    requested = {entity_type: set() for entity_type in FAVORITE_MODELS}
+    parsed = []
+    for item in items:
+        entity_type = item.get("type") if isinstance(item, dict) else None
+        entity_id = item.get("id") if isinstance(item, dict) else None
+        if entity_type not in FAVORITE_MODELS or type(entity_id) is not int:
+            parsed.append((entity_type, entity_id, "invalid"))
+            continue
+        requested[entity_type].add(entity_id)
+        parsed.append((entity_type, entity_id, None))
+
+    found = {}
+    for entity_type, ids in requested.items():
+        model_class = FAVORITE_MODELS[entity_type]
+        found[entity_type] = set()
+        if ids:
+            query = db.select(model_class.id).where(model_class.id.in_(ids))
+            found[entity_type].update(db.session.scalars(query))
+
+    # Existing favorites of this user among the requested entities, in one query
+    conditions = [
+        and_(
+            Favorite.entity_type == FAVORITE_TYPES[entity_type],
+            Favorite.entity_id.in_(ids),
+        )
+        for entity_type, ids in found.items()
+        if ids
+    ]
+    existing = {}
+    if conditions:
+        type_names = {code: name for name, code in FAVORITE_TYPES.items()}
+        rows = db.session.execute(
+            db.select(Favorite.id, Favorite.entity_type, Favorite.entity_id).where(
+                Favorite.user_id == user.id, or_(*conditions)
+            )
+        )
+        for fav_id, code, entity_id in rows:
+            existing[(type_names[code], entity_id)] = fav_id
+
+    results = []
+    to_delete = set()
+    deltas = Counter()
+    for entity_type, entity_id, status in parsed:
+        key = (entity_type, entity_id)
+        if status is None and entity_id not in found[entity_type]:
+            status = "not_found"
+        elif status is None and action == "add":
+            if key in existing:
+                status = "exists"
+            else:
+                db.session.add(
+                    Favorite(
+                        user_id=user.id,
+                        entity_type=FAVORITE_TYPES[entity_type],
+                        entity_id=entity_id,
+                    )
+                )
+                # Duplicates later in the same batch report as existing
+                existing[key] = None
+                status = "added"
+        elif status is None:
+            if key in existing:
+                to_delete.add(existing.pop(key))
+                deltas[(FAVORITE_TYPES[entity_type], entity_id)] -= 1
+                status = "removed"
+            else:
+                status = "not_in_favorites"
+        results.append({"type": entity_type, "id": entity_id, "status": status})
+
+    if to_delete:
+        Favorite.query.filter(Favorite.id.in_(to_delete)).delete(
+            synchronize_session=False
+        )
+        adjust_counts(db.session.connection(), deltas)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request added one of these favorites first
+        db.session.rollback()
+        raise APIException("Favorites changed concurrently, retry", status_code=409)
+    return results
+
+
 # Helper for JWT-protected favorite actions
 def handle_favorite_action_jwt(entity_type, entity_id, action):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-    # Get the entity model and field name
-    models = {
-        "planet": (Planet, "planet_id"),
-        "people": (People, "people_id"),
-        "vehicle": (Vehicle, "vehicle_id"),
-    }
-    model_class, field_name = models[entity_type]
-    entity = model_class.query.get_or_404(entity_id)
-    filter_kwargs = {"user_id": user.id, field_name: entity.id}
-    existing = Favorite.query.filter_by(**filter_kwargs).first()
+    user = current_user
+    entity = FAVORITE_MODELS[entity_type].query.get_or_404(entity_id)
     if action == "add":
-        if existing:
-            return jsonify({"msg": f"{entity_type.title()} already in favorites"}), 400
-        fav = Favorite(user_id=user.id, **{field_name: entity.id})
+        fav = Favorite.for_entity(user.id, entity_type, entity)
         db.session.add(fav)
+        try:
+            # The unique index rejects duplicates, no read-before-insert needed
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"msg": f"{entity_type.title()} already in favorites"}), 400
+        payload = fav.serialize()
         db.session.commit()
-        return jsonify(fav.serialize()), 201
+        return jsonify(payload), 201
     elif action == "remove":
-        if not existing:
+        removed = Favorite.query.filter_by(
+            user_id=user.id,
+            entity_type=FAVORITE_TYPES[entity_type],
+            entity_id=entity.id,
+        ).delete(synchronize_session=False)
+        if not removed:
             return jsonify({"msg": f"{entity_type.title()} not in favorites"}), 404
-        db.session.delete(existing)
+        adjust_counts(
+            db.session.connection(),
+            {(FAVORITE_TYPES[entity_type], entity.id): -removed},
+        )
         db.session.commit()
         return jsonify({"msg": f"{entity_type.title()} removed from favorites"}), 200
@@ -0,0 +1,173 @@
+"""
+Full-text search over people, planets and vehicles.
+
+On SQLite the catalog is mirrored into an FTS5 table, catalog_search, kept
+in sync by triggers on the source tables, so bulk inserts and admin edits
+are indexed the same way. Each row's rowid packs the entity id and type
+(id * 4 + type code), so triggers update the index by rowid without a scan.
+On Postgres the same columns are matched through GIN expression indexes
+over to_tsvector. Both backends rank matches and treat every search term as
+a prefix.
+"""
+
+import re
+
+from models import People, Planet, Vehicle, db
+
+# type -> (model, type code packed into the FTS rowid, indexed text columns)
+SEARCH_TYPES = {
+    "people": (People, 1, ("name",)),
+    "planet": (Planet, 2, ("name", "climate")),
+    "vehicle": (Vehicle, 3, ("name", "model", "manufacturer")),
+}
+TYPE_CODES = {code: entity_type for entity_type, (_, code, _) in SEARCH_TYPES.items()}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_tokens(query):
+    return TOKEN_RE.findall(query.lower())[:10]
+
+
+def _details_sql(columns, prefix):
+    rest = [f"coalesce({prefix}{column}, '')" for column in columns[1:]]
+    return " || ' ' || ".join(rest) if rest else "''"
+
+
+def sqlite_ddl():
+    """Statements creating the FTS5 table and its sync triggers"""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_search USING fts5("
+        "name, details, tokenize='unicode61 remove_diacritics 2')"
+    ]
+    for model, code, columns in SEARCH_TYPES.values():
+        table = model.__tablename__
+        insert = (
+            "INSERT INTO catalog_search(rowid, name, details) VALUES "
+            f"(new.id * 4 + {code}, new.name, {_details_sql(columns, 'new.')});"
+        )
+        delete = f"DELETE FROM catalog_search WHERE rowid = old.id * 4 + {code};"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} "
+            f"BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE ON {table} "
+            f"BEGIN {delete} {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} "
+            f"BEGIN {delete} END",
+        ]
+    return statements
+
+
+def sqlite_backfill():
+    """Statements (re)indexing every existing catalog row"""
+    statements = ["DELETE FROM catalog_search"]
+    for model, code, columns in SEARCH_TYPES.values():
+        statements.append(
+            "INSERT INTO catalog_search(rowid, name, details) "
+            f"SELECT id * 4 + {code}, name, {_details_sql(columns, '')} "
+            f"FROM {model.__tablename__}"
+        )
+    return statements
+
+
+def postgres_vector(columns):
+    """tsvector expression shared by the GIN indexes and the search query"""
+    parts = [f"setweight(to_tsvector('simple', coalesce(name, '')), 'A')"]
+    parts += [
+        f"setweight(to_tsvector('simple', coalesce({column}, '')), 'B')"
+        for column in columns[1:]
+    ]
+    return " || ".join(parts)
+
+
+def create_search_index(connection):
+    """Create the search structures for databases built with db.create_all()"""
+    if connection.dialect.name == "sqlite":
+        for statement in sqlite_ddl() + sqlite_backfill():
+            connection.exec_driver_sql(statement)
+    elif connection.dialect.name == "postgresql":
+        for model, _, columns in SEARCH_TYPES.values():
+            table = model.__tablename__
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} "
+                f"USING gin (({postgres_vector(columns)}))"
+            )
+
+
+def _sqlite_match(tokens):
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _postgres_query(tokens):
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def _sqlite_search(tokens, types, limit, offset):
+    match = _sqlite_match(tokens)
+    codes = ", ".join(str(SEARCH_TYPES[entity_type][1]) for entity_type in types)
+    rows = db.session.execute(
+        db.text(
+            "SELECT rowid, bm25(catalog_search, 10.0, 1.0) AS rank "
+            "FROM catalog_search WHERE catalog_search MATCH :match "
+            f"AND rowid % 4 IN ({codes}) "
+            "ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "limit": limit, "offset": offset},
+    )
+    # bm25() is lower-is-better; flip it so scores read like ts_rank
+    return [(TYPE_CODES[rowid % 4], rowid // 4, -rank) for rowid, rank in rows]
+
+
+def _postgres_search(tokens, types, limit, offset):
+    selects = []
+    for entity_type in types:
+        model, _, columns = SEARCH_TYPES[entity_type]
+        vector = postgres_vector(columns)
+        selects.append(
+            f"SELECT '{entity_type}' AS entity_type, id AS entity_id, "
+            f"ts_rank({vector}, query) AS rank "
+            f"FROM {model.__tablename__}, to_tsquery('simple', :query) query "
+            f"WHERE {vector} @@ query"
+        )
+    rows = db.session.execute(
+        db.text(
+            " UNION ALL ".join(selects)
+            + " ORDER BY rank DESC, entity_id LIMIT :limit OFFSET :offset"
+        ),
+        {
+            "query": _postgres_query(tokens),
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+    return [(entity_type, entity_id, rank) for entity_type, entity_id, rank in rows]
+
+
+def search_catalog(query, types=None, limit=20, offset=0):
+    """Ranked (type, id, score) hits for a free-text query"""
+    tokens = search_tokens(query)
+    types = types or list(SEARCH_TYPES)
+    if not tokens:
+        return []
+    if db.session.get_bind().dialect.name == "postgresql":
+        return _postgres_search(tokens, types, limit, offset)
+    return _sqlite_search(tokens, types, limit, offset)
+
+
+def search_filter(entity_type, query):
+    """WHERE clause limiting a catalog model to index matches, or None"""
+    tokens = search_tokens(query)
+    if not tokens:
+        return None
+    model, code, columns = SEARCH_TYPES[entity_type]
+    if db.session.get_bind().dialect.name == "postgresql":
+        matches = db.text(
+            f"SELECT id FROM {model.__tablename__} "
+            f"WHERE {postgres_vector(columns)} @@ to_tsquery('simple', :query)"
+        ).bindparams(query=_postgres_query(tokens))
+    else:
+        matches = db.text(
+            "SELECT rowid / 4 FROM catalog_search "
+            f"WHERE catalog_search MATCH :match AND rowid % 4 = {code}"
+        ).bindparams(match=_sqlite_match(tokens))
+    return model.id.in_(matches.columns(db.column("id", db.Integer)))
@@ -0,0 +1,280 @@
+"""
+Catalog snapshot: the full people, planets and vehicles lists, shared by
+every worker through one memory-mapped file.
+
+With CATALOG_SNAPSHOT_PATH set (ideally on tmpfs, e.g. /dev/shm), the
+unfiltered GET /api/people, /api/planets and /api/vehicles are answered
+from a file holding each list's JSON body and its gzip/brotli variants.
+A list request never touches the database: gunicorn sends the body
+straight from the file with sendfile() (wsgi.file_wrapper), other servers
+get a slice of the worker's read-only mapping, and either way the bytes sit
+once in the page cache however many workers serve them.
+
+A commit that changes catalog rows rebuilds the file in the committing
+worker: the bodies are written to a temporary file that replaces the
+snapshot with os.replace(). Every request opens the file, so other
+workers pick up the new one at once and remap its header; responses
+already being sent keep the old file. Snapshots carry the catalog version
+they were built at (see changes.py), and a build only replaces a snapshot
+of an older version, so concurrent rebuilds never leave an outdated file
+behind. Writes that skip the session hooks run `flask catalog snapshot`
+(catalog imports do it). Filtered, paged and streamed requests still go
+to the view. A failed rebuild deletes the snapshot, so no worker serves
+outdated lists: the next request builds a new one, and while builds fail
+the lists are read from the database.
+
+Config:
+    CATALOG_SNAPSHOT_PATH   snapshot file; unset disables the snapshot
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime, timezone
+from functools import wraps
+
+from cache import CATALOG_MODELS, make_etag
+from changes import current_version
+from compression import available_encodings, compress, negotiate
+from flask import current_app, has_app_context, request
+from models import People, Planet, Vehicle, api_columns, db
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils import stream_format
+
+# List endpoint -> model
+SNAPSHOT_MODELS = {"people": People, "planets": Planet, "vehicles": Vehicle}
+MAGIC = b"SWSNAP1\n"
+HEADER_SIZE = struct.Struct("<Q")
+
+
+class Snapshot:
+    """One mapped snapshot file"""
+
+    def __init__(self, fh):
+        self.key = stat_key(os.fstat(fh.fileno()))
+        self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(MAGIC) + HEADER_SIZE.size
+        if self.map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{fh.name} is not a catalog snapshot")
+        (size,) = HEADER_SIZE.unpack_from(self.map, len(MAGIC))
+        header = json.loads(self.map[start : start + size])
+        self.version = header["version"]
+        self.entries = header["entries"]
+
+
+def stat_key(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def read_version(path):
+    """Version of the snapshot at path, or None if there is none"""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(len(MAGIC) + HEADER_SIZE.size)
+            if head[: len(MAGIC)] != MAGIC:
+                return None
+            (size,) = HEADER_SIZE.unpack_from(head, len(MAGIC))
+            return json.loads(fh.read(size))["version"]
+    except FileNotFoundError:
+        return None
+
+
+def render_bodies():
+    """(catalog version, {name: body}) read in one go from the primary"""
+    json_provider = current_app.json
+    with db.engine.connect() as connection:
+        # Version first: the rows read next include every change up to it
+        version = current_version(connection)
+        bodies = {}
+        for name, model in SNAPSHOT_MODELS.items():
+            query = db.select(*api_columns(model)).order_by(model.id)
+            rows = [dict(row) for row in connection.execute(query).mappings()]
+            # Same bytes as the list endpoint's jsonify()
+            bodies[name] = json_provider.response(rows).get_data()
+    return version, bodies
+
+
+def write_snapshot(path, version, bodies):
+    """Write a snapshot file next to path and return its temporary name"""
+    encodings = available_encodings()
+    if not current_app.config.get("COMPRESSION_ENABLED", True):
+        encodings = ()
+    entries, blobs = {}, []
+    for name, body in bodies.items():
+        variants = {"identity": body}
+        variants.update((encoding, compress(body, encoding)) for encoding in encodings)
+        entries[name] = {"etag": make_etag(body), "bodies": {}}
+        for encoding, data in variants.items():
+            blobs.append((name, encoding, data))
+    built = datetime.now(timezone.utc).replace(microsecond=0)
+
+    # Offsets depend on the header size, which depends on the offsets
+    header = b""
+    while True:
+        offset = len(MAGIC) + HEADER_SIZE.size + len(header)
+        for name, encoding, data in blobs:
+            entries[name]["bodies"][encoding] = [offset, len(data)]
+            offset += len(data)
+        meta = {"version": version, "built": built.isoformat(), "entries": entries}
+        encoded = json.dumps(meta, separators=(",", ":")).encode()
+        settled = len(encoded) == len(header)
+        header = encoded
+        if settled:
+            break
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".catalog-snapshot-")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(MAGIC + HEADER_SIZE.pack(len(header)) + header)
+        for _, _, data in blobs:
+            fh.write(data)
+    return temp_path
+
+
+class CatalogSnapshot:
+    def __init__(self):
+        self.path = None
+        self._current = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("CATALOG_SNAPSHOT_PATH", None)
+        self.path = app.config["CATALOG_SNAPSHOT_PATH"]
+        self._current = None
+        app.extensions["catalog_snapshot"] = self
+
+    def rebuild(self):
+        """Build a snapshot and put it in place unless a newer one is there"""
+        version, bodies = render_bodies()
+        temp_path = write_snapshot(self.path, version, bodies)
+        try:
+            # One swap at a time, across workers, so versions only go up
+            with self.swap_lock():
+                existing = read_version(self.path)
+                if existing is None or existing <= version:
+                    os.replace(temp_path, self.path)
+                    temp_path = None
+        finally:
+            if temp_path:
+                os.unlink(temp_path)
+        return version
+
+    def build_missing(self):
+        """Build the snapshot if no worker has yet, waiting for one that is"""
+        with self.swap_lock():
+            if not os.path.exists(self.path):
+                version, bodies = render_bodies()
+                os.replace(write_snapshot(self.path, version, bodies), self.path)
+
+    def swap_lock(self):
+        lock = open(self.path + ".lock", "a")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        return lock
+
+    def open(self):
+        """The snapshot file and its mapping, remapped when it was replaced.
+
+        None when there is no snapshot and building one fails.
+        """
+        try:
+            fh = open(self.path, "rb", buffering=0)
+        except FileNotFoundError:
+            # First request, or the last rebuild failed
+            try:
+                self.build_missing()
+                fh = open(self.path, "rb", buffering=0)
+            except Exception:
+                current_app.logger.exception("Catalog snapshot build failed")
+                return None
+        key = stat_key(os.fstat(fh.fileno()))
+        snapshot = self._current
+        if snapshot is None or snapshot.key != key:
+            with self._lock:
+                snapshot = self._current
+                if snapshot is None or snapshot.key != key:
+                    snapshot = self._current = Snapshot(fh)
+        return fh, snapshot
+
+    def response(self, name, fh, snapshot):
+        """The list body from the snapshot, honouring Accept-Encoding"""
+        entry = snapshot.entries[name]
+        mimetype = "application/json"
+        encoding = negotiate(entry["bodies"]["identity"][1], mimetype)
+        if encoding not in entry["bodies"]:
+            encoding = None
+        offset, length = entry["bodies"][encoding or "identity"]
+        file_wrapper = request.environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            # The server sends Content-Length bytes from the file position
+            fh.seek(offset)
+            body = file_wrapper(fh)
+        else:
+            fh.close()
+            body = [snapshot.map[offset : offset + length]]
+        # direct_passthrough: the body is sent as is, never buffered
+        response = current_app.response_class(
+            body, mimetype=mimetype, direct_passthrough=True
+        )
+        response.content_length = length
+        response.set_etag(entry["etag"], weak=bool(encoding))
+        response.cache_control.no_cache = True
+        if current_app.config.get("COMPRESSION_ENABLED", True):
+            response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response.make_conditional(request)
+
+    def serves(self, name):
+        """Answer the unfiltered list view `name` from the snapshot"""
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.path is None or request.args or stream_format(request):
+                    return view(*args, **kwargs)
+                opened = self.open()
+                if opened is None:
+                    return view(*args, **kwargs)
+                return self.response(name, *opened)
+
+            return wrapper
+
+        return decorator
+
+
+catalog_snapshot = CatalogSnapshot()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_snapshot_changes(session, flush_context):
+    changed = (session.new, session.dirty, session.deleted)
+    if any(isinstance(obj, CATALOG_MODELS) for objects in changed for obj in objects):
+        session.info["snapshot_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _rebuild_on_commit(session):
+    if not session.info.pop("snapshot_stale", False):
+        return
+    if has_app_context() and catalog_snapshot.path is not None:
+        try:
+            catalog_snapshot.rebuild()
+        except Exception:
+            # Better no snapshot than a stale one: requests build a new one,
+            # or read the lists from the database while that fails too
+            current_app.logger.exception("Catalog snapshot rebuild failed")
+            try:
+                os.unlink(catalog_snapshot.path)
+            except FileNotFoundError:
+                pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_snapshot_changes(session):
+    session.info.pop("snapshot_stale", None)
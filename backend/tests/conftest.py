@@ -0,0 +1,20 @@
+import pytest
+from benchmarks.common import make_app
+from models import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(
+        tmp_path / "test.db", JWT_SECRET_KEY="test-" * 8, WTF_CSRF_ENABLED=False
+    )
+    with app.app_context():
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
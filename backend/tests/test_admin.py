@@ -0,0 +1,34 @@
+from benchmarks.common import make_user
+from models import FAVORITE_TYPES, Favorite, FavoriteCount, People, db
+
+
+def test_favorite_form_rejects_missing_entity(client):
+    user_id, _ = make_user()
+    person = People(name="Luke", gender="male", birth_year="19BBY", image_url="")
+    db.session.add(person)
+    db.session.commit()
+
+    response = client.post(
+        "/admin/favorite/new/",
+        data={
+            "user": str(user_id),
+            "entity_type": str(FAVORITE_TYPES["people"]),
+            "entity_id": "99999",
+        },
+    )
+    assert response.status_code == 200
+    assert "No people with id 99999" in response.get_data(as_text=True)
+    assert db.session.scalar(db.select(db.func.count()).select_from(Favorite)) == 0
+    assert db.session.scalar(db.select(db.func.count()).select_from(FavoriteCount)) == 0
+
+    response = client.post(
+        "/admin/favorite/new/",
+        data={
+            "user": str(user_id),
+            "entity_type": str(FAVORITE_TYPES["people"]),
+            "entity_id": str(person.id),
+        },
+    )
+    assert response.status_code == 302
+    favorite = db.session.scalars(db.select(Favorite)).one()
+    assert favorite.entity_id == person.id
@@ -0,0 +1,16 @@
+from models import Planet, db
+
+
+def test_cached_lists_revalidate_on_etag(client):
+    db.session.add(Planet(name="Tatooine", climate="arid", population="200000"))
+    db.session.commit()
+
+    response = client.get("/api/planets")
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    assert "Last-Modified" not in response.headers
+
+    etag = response.headers["ETag"]
+    repeat = client.get("/api/planets", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == etag
@@ -0,0 +1,20 @@
+from benchmarks.common import make_user
+
+
+def test_catalog_varies_on_authorization(client):
+    _, headers = make_user()
+
+    anonymous = client.get("/api/catalog")
+    assert "Authorization" in anonymous.vary
+    assert "favorites" not in anonymous.get_json()
+
+    signed_in = client.get("/api/catalog", headers=headers)
+    assert "Authorization" in signed_in.vary
+    assert signed_in.cache_control.private
+    assert signed_in.get_json()["favorites"] == []
+
+
+def test_catalog_ignores_invalid_tokens(client):
+    response = client.get("/api/catalog", headers={"Authorization": "Bearer junk"})
+    assert response.status_code == 200
+    assert "favorites" not in response.get_json()
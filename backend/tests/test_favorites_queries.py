@@ -0,0 +1,51 @@
+"""
+Guards the favorites endpoints against N+1 queries: listing and adding
+favorites must issue a fixed number of SQL statements however many
+favorites the user has.
+"""
+
+import pytest
+from benchmarks.common import count_queries, make_user
+from models import FAVORITE_TYPES, Favorite, People, Planet, Vehicle, db
+
+# User lookup + one SELECT of the favorites with their entities
+LIST_STATEMENTS = 2
+# Entity lookup, INSERT and favorite_count upsert (the user is cached by now)
+ADD_STATEMENTS = 3
+CATALOG_SIZE = 200
+
+
+def seed_catalog(size):
+    for i in range(size):
+        db.session.add(People(name=f"Person {i}", gender="n/a", birth_year="0BBY"))
+        db.session.add(Planet(name=f"Planet {i}", climate="arid", population="0"))
+        db.session.add(Vehicle(name=f"Vehicle {i}", model="X", manufacturer="Y"))
+    db.session.commit()
+
+
+def seed_favorites(user_id, count):
+    types = tuple(FAVORITE_TYPES.values())
+    for i in range(count):
+        db.session.add(
+            Favorite(user_id=user_id, entity_type=types[i % 3], entity_id=i // 3 + 1)
+        )
+    db.session.commit()
+
+
+@pytest.mark.parametrize("favorites", [1, 10, CATALOG_SIZE])
+def test_favorites_statement_count_is_constant(client, favorites):
+    seed_catalog(CATALOG_SIZE)
+    user_id, headers = make_user()
+    seed_favorites(user_id, favorites)
+    db.session.remove()
+
+    with count_queries() as listing:
+        response = client.get("/api/users/favorites", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == favorites
+    assert listing.count <= LIST_STATEMENTS, listing.statements
+
+    with count_queries() as adding:
+        response = client.post(f"/api/favorite/planet/{CATALOG_SIZE}", headers=headers)
+    assert response.status_code == 201, response.get_json()
+    assert adding.count <= ADD_STATEMENTS, adding.statements
@@ -0,0 +1,46 @@
+import shutil
+
+import pytest
+from benchmarks.common import make_app
+from models import People, db
+from replicas import replica_pool
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """App with one replica whose database file is empty (no tables)"""
+    monkeypatch.setattr(replica_pool, "_down_until", {})
+    replica_dir = tmp_path / "replica"
+    replica_dir.mkdir()
+    app = make_app(
+        tmp_path / "test.db",
+        READ_REPLICA_URLS=[f"sqlite:///{replica_dir}/replica.db"],
+    )
+    with app.app_context():
+        db.session.add(People(name="Luke", gender="male", birth_year="", image_url=""))
+        db.session.commit()
+        # The request reuses this session, which would stick to the primary
+        db.session.remove()
+        yield app, replica_dir
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_stream_falls_back_when_replica_is_unreachable(replica_app):
+    app, replica_dir = replica_app
+    db.engines["replica_0"].dispose()
+    shutil.rmtree(replica_dir)
+
+    response = app.test_client().get("/api/people?stream=1")
+    assert response.status_code == 200
+    assert response.get_json()[0]["name"] == "Luke"
+    assert "replica_0" in replica_pool._down_until
+
+
+def test_statement_errors_do_not_mark_replica_down(replica_app):
+    app, _ = replica_app
+    # The replica answers, but has no people table
+    response = app.test_client().get("/api/people")
+    assert response.status_code == 500
+    assert replica_pool._down_until == {}
@@ -0,0 +1,26 @@
+import snapshot
+from models import Planet, db
+from snapshot import catalog_snapshot
+
+
+def add_planet(name):
+    db.session.add(Planet(name=name, climate="arid", population="0"))
+    db.session.commit()
+
+
+def test_failed_rebuild_falls_back_to_the_database(app, tmp_path, monkeypatch):
+    path = tmp_path / "catalog-snapshot"
+    monkeypatch.setattr(catalog_snapshot, "path", str(path))
+    client = app.test_client()
+    add_planet("Tatooine")
+    assert [p["name"] for p in client.get("/api/planets").get_json()] == ["Tatooine"]
+    assert path.exists()
+
+    def fail():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(snapshot, "render_bodies", fail)
+    add_planet("Hoth")
+    assert not path.exists()
+    names = [p["name"] for p in client.get("/api/planets").get_json()]
+    assert names == ["Tatooine", "Hoth"]
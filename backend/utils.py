@@ -1,3 +1,7 @@
+import base64
+import binascii
+import json
+
 from flask import jsonify, url_for
 
 
@@ -17,6 +21,43 @@ class APIException(Exception):
         return rv
 
 
+def encode_cursor(last_id):
+    """Encode the last key of a page, an id or a list of ints, into a cursor"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size=None):
+    """Decode a cursor produced by encode_cursor back into its key.
+
+    With size, the key must be a list of that many ints, returned as a tuple.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise APIException("Invalid cursor", status_code=400)
+    if size is None:
+        if not isinstance(last_id, int):
+            raise APIException("Invalid cursor", status_code=400)
+        return last_id
+    if not isinstance(last_id, list) or len(last_id) != size:
+        raise APIException("Invalid cursor", status_code=400)
+    if not all(isinstance(part, int) for part in last_id):
+        raise APIException("Invalid cursor", status_code=400)
+    return tuple(last_id)
+
+
+def stream_format(request):
+    """Streaming mode requested by the client: "ndjson", "json" or None"""
+    stream = request.args.get("stream", "").lower()
+    if stream == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson":
+        return "ndjson"
+    if stream in ("1", "true", "json"):
+        return "json"
+    return None
+
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
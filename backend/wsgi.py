@@ -1,5 +1,6 @@
 # This file was created to run the application on heroku using gunicorn.
 # Read more about it here: https://devcenter.heroku.com/articles/python-gunicorn
+# `gunicorn --preload wsgi` builds the app once in the master for all workers
 
 from app import create_app
 
@@ -10,8 +10,12 @@ function CardContainer() {
   // Load real API data when component mounts
   useEffect(() => {
     getStarWarsData()
-      .then((apiData) => {
+      .then(({ favorites, ...apiData }) => {
         dispatch({ type: "set_star_wars_data", payload: apiData });
+        // Signed-in users get their favorites in the same response
+        if (favorites) {
+          dispatch({ type: "set_favorites", payload: favorites });
+        }
       })
       .catch((error) => {
         console.error("Failed to load Star Wars data:", error);
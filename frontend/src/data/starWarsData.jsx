@@ -62,19 +62,42 @@ export const getCurrentUser = async () => {
   }
 };
 
+// Backend rows -> the shapes the components use
+const toVehicle = vehicle => ({
+  uid: vehicle.id.toString(),
+  id: vehicle.id,
+  name: vehicle.name,
+  model: vehicle.model,
+  manufacturer: vehicle.manufacturer,
+  image_url: vehicle.image_url,
+  type: "vehicle"
+});
+
+const toCharacter = person => ({
+  uid: person.id.toString(),
+  id: person.id,
+  name: person.name,
+  gender: person.gender,
+  birthYear: person.birth_year,
+  image_url: person.image_url,
+  type: "character"
+});
+
+const toPlanet = planet => ({
+  uid: planet.id.toString(),
+  id: planet.id,
+  name: planet.name,
+  climate: planet.climate,
+  population: planet.population,
+  image_url: planet.image_url,
+  type: "planet"
+});
+
 export const fetchVehicles = async () => {
   try {
     const res = await fetch("/api/vehicles");
     const vehicles = await res.json();
-    return vehicles.map(vehicle => ({
-      uid: vehicle.id.toString(),
-      id: vehicle.id,
-      name: vehicle.name,
-      model: vehicle.model,
-      manufacturer: vehicle.manufacturer,
-      image_url: vehicle.image_url,
-      type: "vehicle"
-    }));
+    return vehicles.map(toVehicle);
   } catch (error) {
     console.error("Error fetching vehicles:", error);
     return [];
@@ -85,15 +108,7 @@ export const fetchPeople = async () => {
   try {
     const res = await fetch("/api/people");
     const people = await res.json();
-    return people.map(person => ({
-      uid: person.id.toString(),
-      id: person.id,
-      name: person.name,
-      gender: person.gender,
-      birthYear: person.birth_year,
-      image_url: person.image_url,
-      type: "character"
-    }));
+    return people.map(toCharacter);
   } catch (error) {
     console.error("Error fetching people:", error);
     return [];
@@ -104,32 +119,54 @@ export const fetchPlanets = async () => {
   try {
     const res = await fetch("/api/planets");
     const planets = await res.json();
-    return planets.map(planet => ({
-      uid: planet.id.toString(),
-      id: planet.id,
-      name: planet.name,
-      climate: planet.climate,
-      population: planet.population,
-      image_url: planet.image_url,
-      type: "planet"
-    }));
+    return planets.map(toPlanet);
   } catch (error) {
     console.error("Error fetching planets:", error);
     return [];
   }
 };
 
+// People, planets, vehicles and (when signed in) favorites in one request
 export const getStarWarsData = async () => {
-  const [characters, planets, vehicles] = await Promise.all([
-    fetchPeople(),
-    fetchPlanets(),
-    fetchVehicles()
-  ]);
-  console.log("getStarWarsData result:", { characters, planets, vehicles });
-  return { characters, planets, vehicles };
+  const headers = authHeader();
+  let res = await fetch(`${BASE_URL}/catalog`, { headers });
+  if (!res.ok && headers.Authorization) {
+    // A token the backend rejects still gets the public catalog
+    res = await fetch(`${BASE_URL}/catalog`);
+  }
+  if (!res.ok) {
+    console.error(`Catalog request failed: ${res.status}`);
+    const [characters, planets, vehicles] = await Promise.all([
+      fetchPeople(),
+      fetchPlanets(),
+      fetchVehicles()
+    ]);
+    return { characters, planets, vehicles };
+  }
+  const catalog = await res.json();
+  const data = {
+    characters: catalog.people.items.map(toCharacter),
+    planets: catalog.planets.items.map(toPlanet),
+    vehicles: catalog.vehicles.items.map(toVehicle)
+  };
+  if (catalog.favorites) {
+    data.favorites = toFrontendFavorites(catalog.favorites);
+  }
+  return data;
 };
 
 // Favorites API functions
+const toFrontendFavorites = backendFavorites => backendFavorites.map(fav => {
+  if (fav.people) {
+    return toCharacter(fav.people);
+  } else if (fav.planet) {
+    return toPlanet(fav.planet);
+  } else if (fav.vehicle) {
+    return toVehicle(fav.vehicle);
+  }
+  return null;
+}).filter(Boolean); // Remove any null entries
+
 export const getFavorites = async () => {
   try {
     const res = await fetch("/api/users/favorites", {
@@ -139,42 +176,7 @@ export const getFavorites = async () => {
       throw new Error('Authentication required');
     }
     const backendFavorites = await res.json();
-    // Transform backend format to frontend format
-    const frontendFavorites = backendFavorites.map(fav => {
-      if (fav.people) {
-        return {
-          uid: fav.people.id.toString(),
-          id: fav.people.id,
-          name: fav.people.name,
-          gender: fav.people.gender,
-          birthYear: fav.people.birth_year,
-          image_url: fav.people.image_url,
-          type: "character"
-        };
-      } else if (fav.planet) {
-        return {
-          uid: fav.planet.id.toString(),
-          id: fav.planet.id,
-          name: fav.planet.name,
-          climate: fav.planet.climate,
-          population: fav.planet.population,
-          image_url: fav.planet.image_url,
-          type: "planet"
-        };
-      } else if (fav.vehicle) {
-        return {
-          uid: fav.vehicle.id.toString(),
-          id: fav.vehicle.id,
-          name: fav.vehicle.name,
-          model: fav.vehicle.model,
-          manufacturer: fav.vehicle.manufacturer,
-          image_url: fav.vehicle.image_url,
-          type: "vehicle"
-        };
-      }
-      return null;
-    }).filter(Boolean); // Remove any null entries
-    return frontendFavorites;
+    return toFrontendFavorites(backendFavorites);
   } catch (error) {
     console.error("Error fetching favorites:", error);
     throw error;
@@ -2,22 +2,12 @@ import { useEffect } from "react";
 import { Outlet, useLocation } from "react-router-dom";
 import Login from "../components/Login";
 import { Navbar } from "../components/Navbar";
-import { getCurrentUser, getFavorites, removeToken } from "../data/starWarsData.jsx";
+import { getCurrentUser, removeToken } from "../data/starWarsData.jsx";
 import useGlobalReducer from "../hooks/useGlobalReducer";
 
 // Base component that maintains the navbar throughout the page.
 export const Layout = () => {
     const { store, dispatch } = useGlobalReducer();
-    // On app load, if user is authenticated, fetch favorites
-    useEffect(() => {
-        if (store.user) {
-            getFavorites().then(favorites => {
-                dispatch({ type: "set_favorites", payload: favorites });
-            }).catch(err => {
-                console.error("Failed to fetch favorites on app load", err);
-            });
-        }
-    }, [store.user, dispatch]);
     // Restore user from token on app load
     useEffect(() => {
         if (!store.user) {